@@ -1,58 +1,198 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
-from typing import Literal, Annotated, Union
-import pickle
-import pandas as pd
-import uvicorn
+import time
+
+# Start of the app import, for the startup timings reported by /health
+IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import PlainTextResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field, ValidationError
+from typing import Literal, Annotated, List, Optional, Union
+import csv
+import hmac
+import io
+import itertools
+import os
+import sys
+
+# Serving imports stay light: a model artifact is served without pandas, sklearn or imblearn,
+# which are only loaded when a pickled pipeline has to be unpickled
+from batching import MicroBatcher, QueueFullError
+from feature_schema import CATEGORIES
+from instrumentation import (BATCH_SIZE, COALESCED, MODEL_LATENCY, STAGE_LATENCY, MetricsMiddleware, ProfileSampler,
+                             shared_metrics)
+from model_manager import ModelManager, ReloadInProgressError, read_sample_records
+from model_router import PRIMARY, ModelRouter, ShadowScorer, UnknownVariantError
+from prediction_cache import PredictionCache, cache_key
+from predictor import predict_rows
+from single_flight import SingleFlight
+from wire_format import (MSGPACK_MEDIA_TYPE, FastJSONResponse, UnsupportedMediaTypeError, decode_body, is_json,
+                         is_msgpack, records_from_columns, render, unpack_msgpack, wants_msgpack)
+from worker_control import CONTROL_SIGNAL, control as worker_control
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load and warm up the model before the server accepts requests; stop background work on shutdown"""
+    load_model()
+    start = time.perf_counter()
+    startup_timings["warmup_predictions"] = await warm_up_predictions(WARMUP_PREDICTIONS)
+    now = time.perf_counter()
+    startup_timings["warmup_ms"] = (now - start) * 1000
+    startup_timings["ready_ms"] = (now - IMPORT_STARTED) * 1000
+    print(f"🚀 Ready {startup_timings['ready_ms']:.0f} ms after import started "
+          f"({startup_timings['warmup_predictions']} warm-up predictions)")
+    model_router.start_watching(MODEL_WATCH_INTERVAL)
+    if worker_control.enabled:
+        # Pre-forked worker: apply admin actions other workers received, including any from before this one started
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(CONTROL_SIGNAL, lambda: loop.run_in_executor(None, worker_control.apply_pending))
+        await run_in_threadpool(worker_control.apply_pending)
+    shared_metrics.start()
+    yield
+    shared_metrics.stop()
+    model_router.stop_watching()
+    if shadow_scorer is not None:
+        shadow_scorer.close()
+    if batcher is not None:
+        await batcher.stop()
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Insurance Premium Prediction API",
     description="API for predicting insurance premium categories based on user data",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
+)
+app.add_middleware(MetricsMiddleware)
+
+# Model to serve: a model artifact directory (memory-mapped, shared between workers)
+# or a pickled pipeline. The artifact is preferred when model_train.py has written one.
+MODEL_PATH = os.getenv("MODEL_PATH", "insurance_model" if os.path.isdir("insurance_model") else "insurance_model.pkl")
+
+# Inference backend: "packed" (flattened forest), "fast" (precomputed preprocessing tables)
+# or "pipeline" (full sklearn pipeline). Unset: "packed" for artifacts, "fast" for pickles.
+# Artifacts can only be served by "packed"; asking for another backend logs a warning.
+PREDICT_BACKEND = os.getenv("PREDICT_BACKEND")
+
+# Hot reload settings: rows from the training CSV used to warm up a model before it is
+# swapped in, and how often to check the model file for changes (0 disables the watcher)
+WARMUP_DATA = os.getenv("MODEL_WARMUP_DATA", "insurance_premium_dataset.csv")
+WARMUP_ROWS = int(os.getenv("MODEL_WARMUP_ROWS", "32"))
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "0"))
+
+# Token required by /admin endpoints (sent as X-Admin-Token); unset disables them
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+# Directory POST /admin/reload may load other models from (unset: only the configured model paths)
+MODELS_DIR = os.getenv("MODELS_DIR")
+
+# Sampled profiling: dump cProfile stats for 1 in N /predict requests (0 disables);
+# can be changed at runtime through POST /admin/profiling
+profiler = ProfileSampler(
+    sample_every=int(os.getenv("PROFILE_SAMPLE_EVERY", "0")),
+    output_dir=os.getenv("PROFILE_DIR", "profiles")
+)
+
+# Single /predict requests run end to end (validation, scoring, serialization) at startup,
+# after the model's own warm-up and before the server accepts traffic
+WARMUP_PREDICTIONS = int(os.getenv("MODEL_WARMUP_PREDICTIONS", "8"))
+
+# The trained model is loaded by the lifespan hook (or by the pre-forking parent), not at import
+model_manager = ModelManager(MODEL_PATH, backend=PREDICT_BACKEND, warmup_data=WARMUP_DATA, warmup_rows=WARMUP_ROWS)
+
+# Other named models served next to MODEL_PATH ("compact=insurance_model_compact,candidate=models/candidate"),
+# the percentage of /predict traffic each of them answers ("compact=10"), and the variant that
+# scores a copy of the primary's requests in the background for comparison. Requests pick a
+# variant explicitly with the X-Model-Variant header.
+model_router = ModelRouter.from_settings(
+    model_manager,
+    variants=os.getenv("MODEL_VARIANTS", ""),
+    traffic=os.getenv("MODEL_TRAFFIC_SPLIT", ""),
+    shadow=os.getenv("MODEL_SHADOW"),
+    backend=PREDICT_BACKEND, warmup_data=WARMUP_DATA, warmup_rows=WARMUP_ROWS
 )
 
-# Load the trained pipeline
-try:
-    with open('insurance_model.pkl', 'rb') as f:
-        pipeline = pickle.load(f)
-    print("✅ Model loaded successfully!")
-except FileNotFoundError:
-    print("❌ Model file 'insurance_model.pkl' not found!")
-    pipeline = None
-except Exception as e:
-    print(f"❌ Error loading model: {e}")
-    pipeline = None
-
-# Input schema based on your training data
+# Share of primary requests mirrored to the shadow model, and how many may wait for it
+# before further ones are dropped
+shadow_scorer = ShadowScorer(
+    model_router.shadow,
+    model_router.manager(model_router.shadow),
+    max_pending=int(os.getenv("MODEL_SHADOW_MAX_PENDING", "64")),
+    sample_rate=float(os.getenv("MODEL_SHADOW_SAMPLE_RATE", "1.0")),
+    cpu_budget=float(os.getenv("MODEL_SHADOW_CPU_BUDGET", "0.25"))
+) if model_router.shadow else None
+
+# Milliseconds spent importing this module, loading the model and warming up; reported by /health
+startup_timings = {"import_ms": None, "model_load_ms": None, "warmup_predictions": 0, "warmup_ms": None, "ready_ms": None}
+
+def load_model():
+    """Load and warm up the configured models, unless loaded already (e.g. before forking workers)"""
+    if model_manager.current is None:
+        start = time.perf_counter()
+        try:
+            model_manager.reload()
+        except FileNotFoundError:
+            print(f"❌ Model file '{MODEL_PATH}' not found!")
+        except Exception as e:
+            print(f"❌ Error loading model: {e}")
+        startup_timings["model_load_ms"] = (time.perf_counter() - start) * 1000
+    model_router.load_variants()
+
+# Micro-batching settings for /predict (set PREDICT_BATCHING=0 to score each request on its own)
+BATCHING_ENABLED = os.getenv("PREDICT_BATCHING", "1") == "1"
+BATCH_MAX_SIZE = int(os.getenv("PREDICT_BATCH_MAX_SIZE", "64"))
+BATCH_MAX_WAIT_MS = float(os.getenv("PREDICT_BATCH_MAX_WAIT_MS", "3"))
+BATCH_QUEUE_SIZE = int(os.getenv("PREDICT_BATCH_QUEUE_SIZE", "2048"))
+
+# Prediction cache settings (PREDICT_CACHE_SIZE=0 disables the cache)
+CACHE_SIZE = int(os.getenv("PREDICT_CACHE_SIZE", "10000"))
+CACHE_TTL_SECONDS = float(os.getenv("PREDICT_CACHE_TTL", "300"))
+
+prediction_cache = PredictionCache(max_size=CACHE_SIZE, ttl_seconds=CACHE_TTL_SECONDS) if CACHE_SIZE > 0 else None
+# Explanations of repeated inputs are memoized the same way
+explanation_cache = PredictionCache(max_size=CACHE_SIZE, ttl_seconds=CACHE_TTL_SECONDS) if CACHE_SIZE > 0 else None
+
+# Identical /predict requests that arrive while one of them is being scored share its result
+# (set PREDICT_COALESCE=0 to score each of them)
+COALESCE_ENABLED = os.getenv("PREDICT_COALESCE", "1") == "1"
+
+# Keyed by (variant, model id, input), so requests never share a result across models
+in_flight_predictions = SingleFlight(on_coalesced=lambda key: COALESCED.inc(key[0])) if COALESCE_ENABLED else None
+
+# Largest grid of variants a single /predict/sweep request may score
+SWEEP_MAX_POINTS = int(os.getenv("PREDICT_SWEEP_MAX_POINTS", "10000"))
+
+# Input schema based on your training data; category lists come from the feature schema the model is trained with
 class UserInput(BaseModel):
     Age: Annotated[int, Field(..., gt=0, lt=120, description="Age of the user")]
-    Gender: Literal["Male", "Female", "Other"] = Field(..., description="Gender of the user")
-    Marital_Status: Literal["Single", "Married", "Divorced", "Widowed"] = Field(..., description="Marital status")
-    Occupation: Literal[
-        "Private Job", "Farmer", "Freelancer", "Teacher", "Student", "Doctor", "Unemployed", "Construction Worker"
-    ] = Field(..., description="Occupation of the user")
-    Education: Literal["HSC", "Bachelor", "Master", "None", "PhD", "Primary", "SSC"] = Field(..., description="Education level")
+    Gender: Literal[CATEGORIES['gender']] = Field(..., description="Gender of the user")
+    Marital_Status: Literal[CATEGORIES['marital_status']] = Field(..., description="Marital status")
+    Occupation: Literal[CATEGORIES['occupation']] = Field(..., description="Occupation of the user")
+    Education: Literal[CATEGORIES['education']] = Field(..., description="Education level")
     Monthly_Income: Annotated[float, Field(..., gt=0, description="Monthly income")]
-    Area_Type: Literal["Urban", "Rural", "Semi-urban"] = Field(..., description="Residential area type")
+    Area_Type: Literal[CATEGORIES['area_type']] = Field(..., description="Residential area type")
     BMI: Annotated[float, Field(..., gt=0, description="Body Mass Index")]
-    Smoking_Status: Literal["Never", "Former", "Current"] = Field(..., description="Smoking status")
-    Alcohol_Consumption: Literal["Never", "Occasional", "Regular"] = Field(..., description="Alcohol consumption")
+    Smoking_Status: Literal[CATEGORIES['smoking_status']] = Field(..., description="Smoking status")
+    Alcohol_Consumption: Literal[CATEGORIES['alcohol_consumption']] = Field(..., description="Alcohol consumption")
     Physical_Activity_hr_wk: Annotated[float, Field(..., gt=0, description="Physical activity per week (hours)")]
     Sleep_hr_day: Annotated[float, Field(..., gt=0, description="Sleep per day (hours)")]
-    Family_History: Literal["Yes", "No"] = Field(..., description="Family history of conditions")
-    Preexisting_Condition: Literal['None', 'Asthma', 'Diabetes', 'Hypertension', 'Heart Disease'] = Field(..., description="Preexisting conditions")
+    Family_History: Literal[CATEGORIES['family_history']] = Field(..., description="Family history of conditions")
+    Preexisting_Condition: Literal[CATEGORIES['preexisting_condition']] = Field(..., description="Preexisting conditions")
     Doctor_Visits_Last_Year: Annotated[int, Field(..., gt=0, description="Doctor visits last year")]
     
     # Current_Medications can accept both string and int for flexibility
     Current_Medications: Union[Literal["Yes", "No"], Literal[0, 1]] = Field(..., description="Currently on medications (Yes/No or 1/0)")
     
-    Stress_Level: Literal["Low", "Moderate", "High"] = Field(..., description="Stress level")
-    Pollution_Exposure: Literal["Low", "Moderate", "High"] = Field(..., description="Pollution exposure")
-    Food_Habit: Literal["Home-cooked", "Mostly Restaurant", "Mixed"] = Field(..., description="Food habit")
+    Stress_Level: Literal[CATEGORIES['stress_level']] = Field(..., description="Stress level")
+    Pollution_Exposure: Literal[CATEGORIES['pollution_exposure']] = Field(..., description="Pollution exposure")
+    Food_Habit: Literal[CATEGORIES['food_habit']] = Field(..., description="Food habit")
     Claim_History: Annotated[int, Field(..., ge=0, description="Previous claim history")]
     Claim_Amount_Last_Year: Annotated[float, Field(..., ge=0, description="Claim amount in last year")]
-    Insurance_Type: Literal["Comprehensive", "Basic", "Family", "Critical Illness"] = Field(..., description="Insurance type")
+    Insurance_Type: Literal[CATEGORIES['insurance_type']] = Field(..., description="Insurance type")
     Policy_Tenure: Annotated[int, Field(..., gt=0, le=10, description="Policy tenure (months)")]
     Premium_Paid_Last_Year: Annotated[float, Field(..., ge=0, description="Premium paid last year")]
     Loyalty_Score: Annotated[float, Field(..., gt=0, le=1, description="Loyalty score")]
@@ -92,64 +232,506 @@ def convert_medications_to_numeric(value):
         return 1 if value.lower() == "yes" else 0
     return value  # Already numeric
 
-@app.post("/predict")
-def predict_premium(user_input: UserInput):
-    """Predict insurance premium category"""
-    if pipeline is None:
+# UserInput field of each training column, to report explanations in API terms
+input_fields = {column: field for field, column in field_mapping.items()}
+
+def prepare_input(user_input: UserInput) -> dict:
+    """Convert a validated UserInput into a row keyed by training column names"""
+    input_data_raw = user_input.model_dump()
+    input_data_raw['Current_Medications'] = convert_medications_to_numeric(input_data_raw['Current_Medications'])
+    return {field_mapping[k]: v for k, v in input_data_raw.items()}
+
+async def read_user_input(request: Request) -> UserInput:
+    """Validate a JSON or MessagePack /predict body; invalid input is a 422 like any FastAPI body"""
+    body = await request.body()
+    content_type = request.headers.get("content-type", "")
+    try:
+        if is_msgpack(content_type):
+            return UserInput.model_validate(unpack_msgpack(body))
+        if is_json(content_type):
+            # pydantic parses and validates the JSON in one pass
+            return UserInput.model_validate_json(body)
+    except UnsupportedMediaTypeError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except ValidationError as ve:
+        raise RequestValidationError([{**error, "loc": ("body", *error["loc"])} for error in ve.errors()])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse body: {str(e) or type(e).__name__}")
+    raise HTTPException(status_code=415, detail=f"Unsupported Content-Type '{content_type}'; "
+                                                f"send application/json or application/msgpack")
+
+def parse_batch_body(body: bytes, content_type: str) -> list:
+    """Parse a batch request body (JSON, MessagePack, NDJSON or CSV) into raw records.
+
+    JSON and MessagePack bodies hold an array of records, an object with a
+    'records' array, or columns: an object with an equally long array per field.
+    """
+    if "text/csv" in content_type:
+        records = list(csv.DictReader(io.StringIO(body.decode("utf-8"))))
+        for record in records:
+            # CSV values arrive as strings; Current_Medications only accepts 0/1 as ints
+            if record.get('Current_Medications') in ("0", "1"):
+                record['Current_Medications'] = int(record['Current_Medications'])
+        return records
+    if "ndjson" in content_type or "jsonl" in content_type:
+        return [decode_body(line, "") for line in body.splitlines() if line.strip()]
+    payload = decode_body(body, content_type)
+    if isinstance(payload, dict):
+        payload = payload["records"] if "records" in payload else records_from_columns(payload)
+    if not isinstance(payload, list):
+        raise ValueError("Expected an array of records, an object with a 'records' array, or an object of columns")
+    return payload
+
+def score_rows(rows: list, model=None, variant: str = PRIMARY) -> list:
+    """Score prepared rows with one model (default: the current primary), one response payload per row"""
+    model = model or model_manager.current
+    BATCH_SIZE.observe(len(rows))
+    start = time.perf_counter()
+    result = predict_rows(model.engine, rows, observe=STAGE_LATENCY.observe)
+    MODEL_LATENCY.observe(time.perf_counter() - start, variant)
+    return [{**row, "model_version": model.model_id, "model_variant": variant} for row in result.rows()]
+
+def score_columns(rows: list, model, shape: tuple = None) -> dict:
+    """Score rows in one model pass; results as one list per output, reshaped to shape (for sweep grids)"""
+    shape = shape or (len(rows),)
+    BATCH_SIZE.observe(len(rows))
+    result = predict_rows(model.engine, rows, observe=STAGE_LATENCY.observe)
+    return {
+        "model_version": model.model_id,
+        "classes": [str(cls) for cls in result.classes],
+        "premium_category": result.labels.astype(str).reshape(shape).tolist(),
+        "probabilities": {
+            str(cls): result.probabilities[:, i].reshape(shape).tolist() for i, cls in enumerate(result.classes)
+        },
+        "confidence": result.confidence.reshape(shape).tolist()
+    }
+
+batcher = MicroBatcher(
+    score_rows,
+    max_batch_size=BATCH_MAX_SIZE,
+    max_wait_ms=BATCH_MAX_WAIT_MS,
+    max_queue_size=BATCH_QUEUE_SIZE
+) if BATCHING_ENABLED else None
+
+async def warm_up_predictions(n: int) -> int:
+    """Send up to n training rows through the /predict path, so the first real request finds it warm.
+
+    Returns the number of predictions made. Nothing is cached.
+    """
+    model = model_manager.current
+    if model is None:
+        return 0
+    done = 0
+    # Some training rows fall outside the API's validation rules; read extra to make up for them
+    for record in read_sample_records(WARMUP_DATA, n * 4):
+        if done == n:
+            break
+        try:
+            input_data = prepare_input(UserInput.model_validate(record))
+        except ValidationError:
+            continue
+        if batcher is not None:
+            prediction = await batcher.submit(input_data, model)
+        else:
+            prediction = score_rows([input_data], model)[0]
+        render(prediction, "")
+        done += 1
+    return done
+
+def explain_row(row: dict, model) -> dict:
+    """Tree-path contributions of each UserInput field to every class probability, largest first.
+
+    base_values plus the sum of a class's contributions equals its predicted probability.
+    """
+    bias, contributions, columns = model.engine.explain_rows([row])
+    contributions = contributions[0]
+    classes = [str(cls) for cls in model.engine.classes_]
+    predicted = int((bias + contributions.sum(axis=0)).argmax())
+    order = abs(contributions[:, predicted]).argsort()[::-1]
+    return {
+        "method": "tree_path",
+        "explained_class": classes[predicted],
+        "base_values": dict(zip(classes, bias.tolist())),
+        "contributions": {
+            input_fields.get(columns[i], columns[i]): dict(zip(classes, contributions[i].tolist())) for i in order
+        }
+    }
+
+def observe_stage(stage: str, stage_start: float) -> float:
+    """Record the time since stage_start for a hot-path stage and return the current time"""
+    now = time.perf_counter()
+    STAGE_LATENCY.observe(now - stage_start, stage)
+    return now
+
+async def score_prediction(input_data: dict, model, variant: str, key: Optional[str]) -> dict:
+    """Score one /predict row with the chosen variant and cache a primary result under key"""
+    if profiler.should_sample():
+        # Sampled request: score it alone, under cProfile, off the event loop
+        prediction = (await run_in_threadpool(
+            profiler.run, "predict", score_rows, [input_data], model, variant))[0]
+    elif variant != PRIMARY:
+        prediction = (await run_in_threadpool(score_rows, [input_data], model, variant))[0]
+    elif batcher is not None:
+        # Score the row in a single pass, together with other requests arriving in the same window,
+        # with the model this request started on even if a reload swaps in another meanwhile
+        prediction = await batcher.submit(input_data, model)
+    else:
+        prediction = (await run_in_threadpool(score_rows, [input_data], model))[0]
+    if variant == PRIMARY and prediction_cache is not None:
+        # Only cached if the model that scored it is still the one being served
+        prediction_cache.put(key, prediction, model_id=prediction["model_version"])
+    return prediction
+
+async def mirror_to_shadow(row: dict, prediction: dict):
+    """Hand a request the primary answered to the shadow model; runs after the response has been sent"""
+    shadow_scorer.submit(row, prediction)
+
+# The /predict body is parsed by the handler (JSON or MessagePack); documented here for /docs
+predict_body_docs = {"requestBody": {"required": True, "content": {
+    media_type: {"schema": UserInput.model_json_schema()} for media_type in ("application/json", MSGPACK_MEDIA_TYPE)
+}}}
+
+@app.post("/predict", openapi_extra=predict_body_docs)
+async def predict_premium(request: Request, explain: bool = False, echo_input: bool = False,
+                          x_model_variant: Optional[str] = Header(None)):
+    """Predict insurance premium category.
+
+    With ?explain=true the response also holds per-field contributions to each class probability,
+    and with ?echo_input=true the input row as the model saw it (input_processed).
+    The X-Model-Variant header picks a configured model variant instead of the traffic split.
+    The body and the response are JSON, or MessagePack with Content-Type/Accept: application/msgpack.
+    """
+    user_input = await read_user_input(request)
+    stage_start = time.perf_counter()
+    STAGE_LATENCY.observe(stage_start - request.state.received_at, "parse_validate")
+    
+    try:
+        variant = model_router.choose(x_model_variant)
+    except UnknownVariantError as e:
+        raise HTTPException(status_code=400, detail=e.args[0])
+    model = model_router.manager(variant).current
+    if model is None:
         raise HTTPException(status_code=503, detail="Model not available. Please check if the model file exists.")
+    # Caches and micro-batches hold the primary model's results only
+    primary = variant == PRIMARY
+    if explain and not hasattr(model.engine, "explain_rows"):
+        raise HTTPException(status_code=400, detail=f"Explanations are not supported by the '{model.engine.name}' backend")
     
     try:
-        # Convert input to dict
-        input_data_raw = user_input.dict()
+        # Convert input to a row keyed by the training column names
+        input_data = prepare_input(user_input)
+        stage_start = observe_stage("field_mapping", stage_start)
         
-        # Convert Current_Medications to numeric if needed
-        input_data_raw['Current_Medications'] = convert_medications_to_numeric(input_data_raw['Current_Medications'])
+        # Repeated inputs are answered from the cache
+        prediction, key = None, None
+        if in_flight_predictions is not None or (
+                primary and (prediction_cache is not None or explanation_cache is not None)):
+            key = cache_key(input_data)
+        if primary and prediction_cache is not None:
+            prediction_cache.ensure_model(model.model_id)
+            prediction = prediction_cache.get(key)
+            stage_start = observe_stage("cache_lookup", stage_start)
         
-        # Map field names to expected column names (matching training data after lowercase conversion)
-        input_data = {field_mapping[k]: v for k, v in input_data_raw.items()}
+        if prediction is None:
+            if in_flight_predictions is not None:
+                # Identical requests already being scored are waited on rather than scored again
+                prediction = await in_flight_predictions.do(
+                    (variant, model.model_id, key), lambda: score_prediction(input_data, model, variant, key))
+            else:
+                prediction = await score_prediction(input_data, model, variant, key)
+            stage_start = observe_stage("scoring", stage_start)
         
-        # Create DataFrame with the same structure as training data
-        input_df = pd.DataFrame([input_data])
+        if explain:
+            explanation = None
+            if primary and explanation_cache is not None:
+                explanation_cache.ensure_model(model.model_id)
+                explanation = explanation_cache.get(key)
+            if explanation is None:
+                explanation = await run_in_threadpool(explain_row, input_data, model)
+                if primary and explanation_cache is not None:
+                    explanation_cache.put(key, explanation, model_id=model.model_id)
+            prediction = {**prediction, "explanation": explanation}
+            stage_start = observe_stage("explain", stage_start)
         
-        # Use the pipeline to predict (it handles preprocessing automatically)
-        prediction = pipeline.predict(input_df)
-        
-        # Get prediction probabilities
-        prediction_proba = pipeline.predict_proba(input_df)
-        
-        # Get class labels
-        classes = pipeline.named_steps['classifier'].classes_
-        
-        # Create probability dictionary
-        probabilities = {str(cls): float(prob) for cls, prob in zip(classes, prediction_proba[0])}
-        
-        return {
-            "premium_category": str(prediction[0]),
-            "probabilities": probabilities,
-            "confidence": float(max(prediction_proba[0])),
-            "input_processed": input_data
-        }
+        # The shadow model only sees the request once the primary response has been sent
+        shadow = BackgroundTask(mirror_to_shadow, input_data, prediction) \
+            if primary and shadow_scorer is not None else None
+        if echo_input:
+            prediction = {**prediction, "input_processed": input_data}
+        response = render(prediction, request.headers.get("accept", ""), background=shadow)
+        observe_stage("serialization", stage_start)
+        return response
         
+    except QueueFullError as qe:
+        raise HTTPException(status_code=429, detail=f"Server busy: {qe}", headers={"Retry-After": "1"})
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=f"Input validation error: {ve}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction error: {e}")
 
+@app.post("/predict/batch")
+async def predict_premium_batch(request: Request, columnar: Optional[bool] = None):
+    """Predict insurance premium categories for many records in one model pass.
+
+    Accepts a JSON or MessagePack array of records (or {"records": [...]}, or an
+    object of columns), NDJSON or CSV body. Rows that fail validation are
+    reported under "errors" without failing the batch. With ?columnar=true
+    (the default for MessagePack responses) results are returned as one array
+    per output, in the order of "index", instead of one object per row.
+    """
+    model = model_manager.current
+    if model is None:
+        raise HTTPException(status_code=503, detail="Model not available. Please check if the model file exists.")
+
+    accept = request.headers.get("accept", "")
+    if columnar is None:
+        columnar = wants_msgpack(accept)
+    try:
+        records = parse_batch_body(await request.body(), request.headers.get("content-type", ""))
+    except UnsupportedMediaTypeError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except (ValueError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse batch body: {e}")
+
+    # Validate every record, keeping track of the original position
+    rows, row_indices, errors = [], [], []
+    for index, record in enumerate(records):
+        try:
+            rows.append(prepare_input(UserInput.model_validate(record)))
+            row_indices.append(index)
+        except ValidationError as ve:
+            errors.append({"index": index, "errors": ve.errors(include_url=False, include_context=False, include_input=False)})
+
+    summary = {"total": len(records), "succeeded": len(rows), "failed": len(errors)}
+    try:
+        if columnar:
+            scored = await run_in_threadpool(score_columns, rows, model) if rows else {}
+            return render({**summary, "index": row_indices, **scored, "errors": errors}, accept)
+        predictions = await run_in_threadpool(score_rows, rows, model) if rows else []
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Prediction error: {e}")
+    results = [{"index": index, **prediction} for index, prediction in zip(row_indices, predictions)]
+    return render({**summary, "results": results, "errors": errors}, accept)
+
+class SweepAxis(BaseModel):
+    field: str = Field(..., description="UserInput field to vary")
+    values: Optional[Annotated[List[Union[int, float, str]], Field(max_length=SWEEP_MAX_POINTS)]] = Field(
+        None, description="Explicit values to try"
+    )
+    start: Optional[float] = Field(None, description="First value of an evenly spaced numeric range")
+    stop: Optional[float] = Field(None, description="Last value of an evenly spaced numeric range")
+    steps: Annotated[int, Field(20, ge=2, le=1000, description="Number of values in the numeric range")]
+
+class SweepRequest(BaseModel):
+    base: UserInput
+    axes: Annotated[List[SweepAxis], Field(..., min_length=1, max_length=2, description="One or two fields to sweep")]
+
+def sweep_axis_values(axis: SweepAxis) -> list:
+    """Raw values of a sweep axis: the explicit list, or an evenly spaced range (rounded for integer fields)"""
+    if axis.field not in UserInput.model_fields:
+        raise ValueError(f"Unknown field '{axis.field}'")
+    if axis.values is not None:
+        values = axis.values
+    elif axis.start is not None and axis.stop is not None:
+        values = [axis.start + (axis.stop - axis.start) * i / (axis.steps - 1) for i in range(axis.steps)]
+        if UserInput.model_fields[axis.field].annotation is int:
+            values = list(dict.fromkeys(round(value) for value in values))
+    else:
+        raise ValueError(f"Axis '{axis.field}' needs either values or start and stop")
+    if not values:
+        raise ValueError(f"Axis '{axis.field}' has no values")
+    return values
+
+@app.post("/predict/sweep")
+async def predict_sweep(sweep_request: SweepRequest):
+    """What-if analysis: vary one or two fields of a base input and score every combination.
+
+    The whole grid is scored as a single batch. Results are lists over the
+    first axis, or lists of lists (first axis x second axis) for two axes.
+    """
+    model = model_manager.current
+    if model is None:
+        raise HTTPException(status_code=503, detail="Model not available. Please check if the model file exists.")
+
+    base = sweep_request.base.model_dump()
+    axes = sweep_request.axes
+    if len({axis.field for axis in axes}) != len(axes):
+        raise HTTPException(status_code=400, detail="Sweep axes must use different fields")
+
+    try:
+        axis_values = [sweep_axis_values(axis) for axis in axes]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Reject oversized grids before validating any of their values
+    shape = tuple(len(values) for values in axis_values)
+    n_points = 1
+    for size in shape:
+        n_points *= size
+    if n_points > SWEEP_MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f"Sweep of {n_points} points exceeds the limit of {SWEEP_MAX_POINTS}")
+
+    # Validate and normalize each axis value once; grid rows are then cheap copies of the base row
+    axis_columns = []
+    try:
+        for axis, values in zip(axes, axis_values):
+            column = field_mapping[axis.field]
+            normalized = [prepare_input(UserInput.model_validate({**base, axis.field: value}))[column] for value in values]
+            axis_columns.append((column, normalized))
+    except ValueError as e:
+        # ValidationError is a ValueError; report it without echoing inputs
+        detail = e.errors(include_url=False, include_context=False, include_input=False) \
+            if isinstance(e, ValidationError) else str(e)
+        raise HTTPException(status_code=400, detail=detail)
+
+    base_row = prepare_input(sweep_request.base)
+    columns = [column for column, _ in axis_columns]
+    rows = [
+        {**base_row, **dict(zip(columns, combination))}
+        for combination in itertools.product(*(normalized for _, normalized in axis_columns))
+    ]
+
+    try:
+        scored = await run_in_threadpool(score_columns, rows, model, shape)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Prediction error: {e}")
+
+    return {
+        "axes": [{"field": axis.field, "values": values} for axis, values in zip(axes, axis_values)],
+        "points": n_points,
+        **scored
+    }
+
 @app.get("/health")
 def health_check():
     """Health check endpoint"""
-    model_status = "healthy" if pipeline is not None else "model_not_loaded"
+    model = model_manager.current
+    model_status = "healthy" if model is not None else "model_not_loaded"
     return {
         "status": "healthy",
         "model_status": model_status,
-        "message": "API is running smoothly" if pipeline is not None else "API running but model not loaded"
+        "message": "API is running smoothly" if model is not None else "API running but model not loaded",
+        **(model.info() if model is not None else {}),
+        "last_reload_error": model_manager.last_error,
+        "variants": list(model_router.managers),
+        "startup": startup_timings
+    }
+
+@app.get("/models")
+def model_variants():
+    """Served model variants with their traffic share and scoring latency, and the shadow comparison so far"""
+    return {
+        "variants": model_router.info(),
+        "shadow": shadow_scorer.stats() if shadow_scorer is not None else None
+    }
+
+def check_admin_token(token: Optional[str]):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set ADMIN_TOKEN to enable them")
+    if token is None or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+def resolve_model_path(path: str) -> str:
+    """A reload path inside MODELS_DIR (relative paths are taken relative to it), as a real path.
+
+    Loading a pickle runs code, so nothing outside that directory is ever loaded on request.
+    """
+    if not MODELS_DIR:
+        raise HTTPException(status_code=400, detail="Reloading from another path requires MODELS_DIR to be set")
+    models_dir = os.path.realpath(MODELS_DIR)
+    resolved = os.path.realpath(os.path.join(models_dir, path))
+    if os.path.commonpath([models_dir, resolved]) != models_dir or resolved == models_dir:
+        raise HTTPException(status_code=400, detail=f"Model path must be inside MODELS_DIR ({MODELS_DIR})")
+    return resolved
+
+class ReloadRequest(BaseModel):
+    path: Optional[str] = Field(None, description="Model artifact or pickle inside MODELS_DIR to load "
+                                                  "(default: the variant's configured path)")
+    force: bool = Field(False, description="Reload even if the model has not changed")
+    variant: str = Field(PRIMARY, description="Model variant to reload (see GET /models)")
+
+@app.post("/admin/reload")
+async def reload_model(reload_request: Optional[ReloadRequest] = None, x_admin_token: Optional[str] = Header(None)):
+    """Load, warm up and atomically swap in a new model; in-flight requests finish on the old one"""
+    check_admin_token(x_admin_token)
+    reload_request = reload_request or ReloadRequest()
+    try:
+        manager = model_router.manager(reload_request.variant)
+    except UnknownVariantError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+    path = resolve_model_path(reload_request.path) if reload_request.path else None
+    previous = manager.current
+    try:
+        model = await run_in_threadpool(manager.reload, path, reload_request.force)
+    except ReloadInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Model reload failed, previous model still serving: {e}")
+
+    # Under `serve --workers N` every other worker reloads too
+    worker_control.publish("reload", key=f"reload:{reload_request.variant}", variant=reload_request.variant,
+                           path=manager.path, force=reload_request.force)
+    return {
+        "variant": reload_request.variant,
+        "reloaded": model is not previous,
+        "all_workers": worker_control.enabled,
+        "previous_version": previous.model_id if previous is not None else None,
+        **model.info()
     }
 
+def apply_reload(variant: str, path: str, force: bool):
+    """A reload another worker received (see POST /admin/reload)"""
+    model_router.manager(variant).reload(path, force)
+
+worker_control.register("reload", apply_reload)
+
+class ProfilingRequest(BaseModel):
+    sample_every: Annotated[int, Field(..., ge=0, description="Profile 1 in N /predict requests (0 disables)")]
+
+@app.post("/admin/profiling")
+def configure_profiling(profiling_request: ProfilingRequest, x_admin_token: Optional[str] = Header(None)):
+    """Turn sampled cProfile profiling of /predict on or off at runtime (in every worker); profiles go to PROFILE_DIR"""
+    check_admin_token(x_admin_token)
+    profiler.configure(profiling_request.sample_every)
+    worker_control.publish("profiling", sample_every=profiling_request.sample_every)
+    return {**profiler.status(), "all_workers": worker_control.enabled}
+
+worker_control.register("profiling", profiler.configure)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus metrics: per-stage latency histograms and request/error/in-flight counts, summed over all workers"""
+    return PlainTextResponse(shared_metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/cache/stats")
+def cache_stats():
+    """Prediction cache hit/miss/eviction counters of the worker (pid) that answers; each worker has its own cache"""
+    if prediction_cache is None:
+        return {"enabled": False, "pid": os.getpid()}
+    return {"enabled": True, "pid": os.getpid(), **prediction_cache.stats()}
+
+@app.get("/ready")
+def readiness_check():
+    """Readiness probe: 200 once this worker has a model to serve, 503 otherwise"""
+    if model_manager.current is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    return {"status": "ready", "pid": os.getpid()}
+
+startup_timings["import_ms"] = (time.perf_counter() - IMPORT_STARTED) * 1000
+
 if __name__ == "__main__":
-    uvicorn.run(
-        "app:app",
-        host="127.0.0.1",
-        port=8000,
-        reload=True,
-        log_level="info"
-    )
\ No newline at end of file
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        # Production mode: the model is loaded here and shared with forked workers
+        from serve import serve
+        load_model()
+        serve(app, sys.argv[2:])
+    else:
+        import uvicorn
+        uvicorn.run(
+            "app:app",
+            host="127.0.0.1",
+            port=8000,
+            reload=True,
+            log_level="info"
+        )
@@ -0,0 +1,106 @@
+"""Asyncio micro-batcher for single-row prediction requests.
+
+Requests that arrive within a short window (or until the batch is full) are
+scored together with one model call, and each caller gets its own row of the
+result back. Each row is scored by the model its caller submitted it with, so a
+batch that spans a model swap is split into one call per model. The queue is bounded so overload turns into fast rejections
+instead of unbounded latency.
+"""
+import asyncio
+from typing import Callable, Optional
+
+
+class QueueFullError(Exception):
+    """Raised when the micro-batcher queue has no room for another request"""
+
+
+class MicroBatcher:
+    def __init__(self, predict_fn: Callable[[list, object], list], max_batch_size: int = 64,
+                 max_wait_ms: float = 3.0, max_queue_size: int = 2048):
+        """predict_fn(rows, model) scores a list of rows with model and returns one result per row, in order"""
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_queue_size = max_queue_size
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _ensure_running(self):
+        """Start the batching task on the current event loop if it is not running"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self._task = loop.create_task(self._run())
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, row, model=None):
+        """Queue one row for scoring with model and wait for its result"""
+        self._ensure_running()
+        future = self._loop.create_future()
+        try:
+            self._queue.put_nowait((row, model, future))
+        except asyncio.QueueFull:
+            raise QueueFullError(f"Prediction queue is full ({self.max_queue_size} pending requests)")
+        return await future
+
+    async def stop(self):
+        """Cancel the batching task; pending callers are cancelled with it"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, _, future = self._queue.get_nowait()
+                future.cancel()
+        self._task = None
+
+    async def _collect(self) -> list:
+        """Wait for one request, then gather more until the batch is full or the window closes"""
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            # Take whatever is already queued without waiting
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # Callers that gave up (client disconnects) don't need scoring
+        return [(row, model, future) for row, model, future in batch if not future.done()]
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            # One model call per model, for batches that span a model swap
+            by_model = {}
+            for row, model, future in batch:
+                by_model.setdefault(id(model), (model, []))[1].append((row, future))
+            for model, requests in by_model.values():
+                await self._score(model, requests)
+
+    async def _score(self, model, requests: list):
+        try:
+            # Score off the event loop so new requests keep queueing meanwhile
+            results = await self._loop.run_in_executor(None, self.predict_fn, [row for row, _ in requests], model)
+        except Exception as e:
+            for _, future in requests:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(requests, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,550 @@
+"""Benchmark suite for the prediction API and the model engines.
+
+Drives the FastAPI app either in-process (ASGI transport, no network) or over
+a localhost uvicorn server, with synthetic requests drawn from
+insurance_premium_dataset.csv. Reports p50/p95/p99 latency and throughput for
+/predict at several concurrency levels and /predict/batch at several batch
+sizes, plus the time the engine spends in preprocessing vs. the forest.
+The startup command measures cold starts of fresh processes instead: app
+import time, time until a uvicorn server is ready, and first-request latency.
+The encoding command measures the server CPU time and bytes per 10k
+predictions for each request/response encoding (JSON with and without the
+echoed input, MessagePack, and row vs. columnar batches).
+The coalesce command measures /predict under bursts of concurrent requests,
+many with identical bodies, with coalescing of identical in-flight requests
+on and off.
+
+Usage:
+    python benchmark.py run --target inprocess --output bench_new.json
+    python benchmark.py run --target uvicorn --concurrency 1 16 64
+    python benchmark.py startup --runs 5 --output startup.json
+    python benchmark.py encoding --predictions 10000 --batch-size 100
+    python benchmark.py coalesce --bursts 50 --burst-size 64 --distinct 4
+    python benchmark.py compare bench_old.json bench_new.json --threshold 0.1
+"""
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+import httpx
+
+# Fields perturbed to make every synthetic request unique (so the prediction cache doesn't hide model cost)
+PERTURBED_FIELDS = ("Monthly_Income", "Claim_Amount_Last_Year", "Premium_Paid_Last_Year")
+WARMUP_REQUESTS = 50
+
+
+def load_payloads(data_path: str, n: int, seed: int, unique: bool = True) -> list:
+    """Draw n valid /predict payloads from the dataset, with small numeric jitter if unique"""
+    from app import UserInput
+    from pydantic import ValidationError
+
+    df = pd.read_csv(data_path, keep_default_na=False).drop(columns=['Premium_Category'], errors='ignore')
+    records = []
+    for record in df.to_dict(orient='records'):
+        try:
+            UserInput.model_validate(record)
+            records.append(record)
+        except ValidationError:
+            continue
+
+    rng = random.Random(seed)
+    payloads = []
+    for _ in range(n):
+        payload = dict(rng.choice(records))
+        if unique:
+            for field in PERTURBED_FIELDS:
+                payload[field] = round(float(payload[field]) * (1 + rng.uniform(0, 0.01)) + 0.01, 2)
+        payloads.append(payload)
+    return payloads
+
+
+def summarize(latencies_ms: list, wall_seconds: float, n_rows: int = None) -> dict:
+    latencies = np.asarray(latencies_ms)
+    summary = {
+        "requests": len(latencies),
+        "mean_ms": float(latencies.mean()),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "throughput_rps": len(latencies) / wall_seconds
+    }
+    if n_rows is not None:
+        summary["rows_per_second"] = n_rows / wall_seconds
+    return summary
+
+
+async def run_predict_level(client, payloads: list, cursor, concurrency: int, n_requests: int) -> dict:
+    """Send n_requests to /predict from `concurrency` concurrent clients.
+
+    cursor is shared across levels so each level sends payloads the previous ones haven't.
+    """
+    latencies, errors = [], 0
+    queue = iter(range(n_requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in queue:
+            start = time.perf_counter()
+            response = await client.post("/predict", json=payloads[next(cursor) % len(payloads)])
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return {**summarize(latencies, time.perf_counter() - start), "errors": errors}
+
+
+async def run_batch_level(client, payloads: list, batch_size: int, n_batches: int) -> dict:
+    """Send n_batches sequential /predict/batch requests of batch_size rows"""
+    latencies, errors = [], 0
+    start = time.perf_counter()
+    for i in range(n_batches):
+        batch = [payloads[(i * batch_size + j) % len(payloads)] for j in range(batch_size)]
+        request_start = time.perf_counter()
+        response = await client.post("/predict/batch", json=batch)
+        latencies.append((time.perf_counter() - request_start) * 1000)
+        if response.status_code != 200 or response.json()["failed"]:
+            errors += 1
+    return {**summarize(latencies, time.perf_counter() - start, n_rows=batch_size * n_batches), "errors": errors}
+
+
+def stage_breakdown(payloads: list, batch_sizes: list, repeats: int) -> dict:
+    """Median time the served engine spends preprocessing vs. evaluating the forest"""
+    from app import UserInput, load_model, model_manager, prepare_input
+
+    load_model()
+    model = model_manager.current
+    rows = [prepare_input(UserInput.model_validate(payload)) for payload in payloads]
+    results = {"backend": model.engine.name}
+    for batch_size in batch_sizes:
+        batch = (rows * (batch_size // len(rows) + 1))[:batch_size]
+        preprocess, forest = [], []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            X = model.engine.encode(batch)
+            middle = time.perf_counter()
+            model.engine.predict_proba_features(X)
+            preprocess.append((middle - start) * 1000)
+            forest.append((time.perf_counter() - middle) * 1000)
+        results[f"batch={batch_size}"] = {
+            "preprocess_ms": float(np.median(preprocess)),
+            "forest_ms": float(np.median(forest))
+        }
+    return results
+
+
+def start_uvicorn(port: int, poll_interval: float = 0.2, env: dict = None) -> subprocess.Popen:
+    """Start the API on localhost (with extra environment variables) and wait until /ready answers"""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env={**os.environ, **(env or {})}
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/ready", timeout=1).status_code == 200:
+                return process
+        except httpx.TransportError:
+            pass
+        if process.poll() is not None:
+            break
+        time.sleep(poll_interval)
+    process.terminate()
+    raise RuntimeError("uvicorn server did not become ready")
+
+
+def measure_startup(port: int, payloads: list) -> dict:
+    """Cold start of fresh processes: app import, time until a uvicorn server is ready, first /predict"""
+    output = subprocess.check_output(
+        [sys.executable, "-c", "import time; start = time.perf_counter(); import app; "
+                               "print((time.perf_counter() - start) * 1000)"]
+    )
+    import_ms = float(output.split()[-1])
+
+    start = time.perf_counter()
+    server = start_uvicorn(port, poll_interval=0.01)
+    ready_ms = (time.perf_counter() - start) * 1000
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+            latencies = []
+            for payload in payloads:
+                request_start = time.perf_counter()
+                client.post("/predict", json=payload).raise_for_status()
+                latencies.append((time.perf_counter() - request_start) * 1000)
+            server_timings = client.get("/health").json().get("startup", {})
+    finally:
+        server.terminate()
+        server.wait()
+    return {
+        "import_ms": import_ms,
+        "ready_ms": ready_ms,
+        "first_request_ms": latencies[0],
+        "warm_request_ms": float(np.median(latencies[1:])),
+        "server": server_timings
+    }
+
+
+def run_startup(args) -> dict:
+    """Median cold-start timings over args.runs fresh servers"""
+    payloads = load_payloads(args.data, args.requests, args.seed)
+    runs = []
+    for i in range(args.runs):
+        run = measure_startup(args.port, payloads)
+        runs.append(run)
+        print(f"run {i + 1}: import {run['import_ms']:7.0f} ms  ready {run['ready_ms']:7.0f} ms  "
+              f"first /predict {run['first_request_ms']:7.2f} ms  warm /predict {run['warm_request_ms']:7.2f} ms")
+    summary = {
+        metric: float(np.median([run[metric] for run in runs]))
+        for metric in ("import_ms", "ready_ms", "first_request_ms", "warm_request_ms")
+    }
+    print(f"median: import {summary['import_ms']:7.0f} ms  ready {summary['ready_ms']:7.0f} ms  "
+          f"first /predict {summary['first_request_ms']:7.2f} ms  warm /predict {summary['warm_request_ms']:7.2f} ms")
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "runs": args.runs,
+            "env": {key: value for key, value in os.environ.items() if key.startswith(("PREDICT_", "MODEL_"))}
+        },
+        "startup": {"uvicorn": summary},
+        "runs": runs
+    }
+
+
+def process_cpu_seconds(pid: int) -> float:
+    """User + system CPU time a process has used so far, from /proc (Linux only)"""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def encoding_requests(payloads: list, encoding: str, batch_size: int) -> list:
+    """Pre-encoded (path, body, headers) requests scoring every payload once in the given encoding"""
+    import msgpack
+
+    json_headers = {"Content-Type": "application/json"}
+    msgpack_headers = {"Content-Type": "application/msgpack", "Accept": "application/msgpack"}
+    if encoding == "json+echo":
+        return [("/predict?echo_input=true", json.dumps(payload).encode(), json_headers) for payload in payloads]
+    if encoding == "json":
+        return [("/predict", json.dumps(payload).encode(), json_headers) for payload in payloads]
+    if encoding == "msgpack":
+        return [("/predict", msgpack.packb(payload), msgpack_headers) for payload in payloads]
+
+    batches = [payloads[start:start + batch_size] for start in range(0, len(payloads), batch_size)]
+    if encoding == "batch-json":
+        return [("/predict/batch", json.dumps(batch).encode(), json_headers) for batch in batches]
+    if encoding == "batch-msgpack-columnar":
+        return [
+            ("/predict/batch", msgpack.packb({field: [row[field] for row in batch] for field in batch[0]}),
+             msgpack_headers)
+            for batch in batches
+        ]
+    raise ValueError(f"Unknown encoding '{encoding}'")
+
+
+ENCODINGS = ("json+echo", "json", "msgpack", "batch-json", "batch-msgpack-columnar")
+
+
+def run_encoding(args) -> dict:
+    """Server CPU time and bytes per 10k predictions for each request/response encoding.
+
+    Requests are encoded up front and sent one at a time, so the CPU time
+    measured in the server process is its own parsing, scoring and encoding
+    work. The prediction cache is disabled, as every encoding scores the same
+    payloads.
+    """
+    payloads = load_payloads(args.data, args.predictions, args.seed)
+    scale = 10000 / len(payloads)
+    server = start_uvicorn(args.port, env={"PREDICT_CACHE_SIZE": "0"})
+    results = {}
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{args.port}", timeout=60) as client:
+            for encoding in args.encodings:
+                requests = encoding_requests(payloads, encoding, args.batch_size)
+                for path, body, headers in requests[:WARMUP_REQUESTS]:
+                    client.post(path, content=body, headers=headers).raise_for_status()
+
+                request_bytes = response_bytes = 0
+                cpu_start, start = process_cpu_seconds(server.pid), time.perf_counter()
+                for path, body, headers in requests:
+                    response = client.post(path, content=body, headers=headers)
+                    response.raise_for_status()
+                    request_bytes += len(body)
+                    response_bytes += len(response.content)
+                wall_seconds = time.perf_counter() - start
+                cpu_seconds = process_cpu_seconds(server.pid) - cpu_start
+
+                results[encoding] = {
+                    "requests": len(requests),
+                    "predictions": len(payloads),
+                    "cpu_ms_per_10k": cpu_seconds * 1000 * scale,
+                    "wall_ms_per_10k": wall_seconds * 1000 * scale,
+                    "request_bytes_per_prediction": request_bytes / len(payloads),
+                    "response_bytes_per_prediction": response_bytes / len(payloads)
+                }
+    finally:
+        server.terminate()
+        server.wait()
+
+    baseline = results.get(args.encodings[0], {}).get("cpu_ms_per_10k")
+    print(f"{'encoding':<24}{'server CPU / 10k':>18}{'CPU saved':>12}{'req B/pred':>12}{'resp B/pred':>13}")
+    for encoding, result in results.items():
+        saved = f"{1 - result['cpu_ms_per_10k'] / baseline:.0%}" if baseline else ""
+        print(f"{encoding:<24}{result['cpu_ms_per_10k']:15.0f} ms{saved:>16}"
+              f"{result['request_bytes_per_prediction']:12.0f}{result['response_bytes_per_prediction']:13.0f}")
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "predictions": len(payloads),
+            "batch_size": args.batch_size,
+            "env": {key: value for key, value in os.environ.items() if key.startswith(("PREDICT_", "MODEL_"))}
+        },
+        "encoding": results
+    }
+
+
+async def run_coalesce(args) -> dict:
+    """Latency and throughput of bursts of concurrent, partly identical /predict requests, in-process,
+    with and without coalescing.
+
+    The prediction cache is disabled, so it doesn't answer the repeats
+    instead. Correctness of coalescing is checked by tests/test_coalescing.py.
+    """
+    os.environ.setdefault("PREDICT_CACHE_SIZE", "0")
+    import app as api
+    from instrumentation import COALESCED
+
+    if api.prediction_cache is not None or api.in_flight_predictions is None:
+        raise SystemExit("❌ The coalesce benchmark needs PREDICT_CACHE_SIZE=0 and PREDICT_COALESCE=1")
+    payloads = load_payloads(args.data, args.distinct * args.bursts, args.seed)
+    rng = random.Random(args.seed)
+    flight = api.in_flight_predictions
+    results = {}
+    async with api.app.router.lifespan_context(api.app), \
+            httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://benchmark") as client:
+        for mode in ("coalesce", "off"):
+            api.in_flight_predictions = flight if mode == "coalesce" else None
+            coalesced_before = COALESCED.value(api.PRIMARY)
+            latencies, errors = [], 0
+
+            async def send(payload):
+                nonlocal errors
+                start = time.perf_counter()
+                response = await client.post("/predict", json=payload)
+                latencies.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    errors += 1
+
+            start = time.perf_counter()
+            for burst in range(args.bursts):
+                distinct = payloads[burst * args.distinct:(burst + 1) * args.distinct]
+                burst_payloads = [distinct[i % len(distinct)] for i in range(args.burst_size)]
+                rng.shuffle(burst_payloads)
+                await asyncio.gather(*[send(payload) for payload in burst_payloads])
+            wall_seconds = time.perf_counter() - start
+
+            coalesced = int(COALESCED.value(api.PRIMARY) - coalesced_before)
+            results[mode] = {**summarize(latencies, wall_seconds), "errors": errors, "coalesced": coalesced}
+            print(f"/predict {mode:<9} {len(latencies)} requests  {coalesced:6d} coalesced  "
+                  f"p50 {results[mode]['p50_ms']:8.2f} ms  p99 {results[mode]['p99_ms']:8.2f} ms  "
+                  f"{results[mode]['throughput_rps']:8.1f} req/s")
+        api.in_flight_predictions = flight
+
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "bursts": args.bursts,
+            "burst_size": args.burst_size,
+            "distinct": args.distinct,
+            "env": {key: value for key, value in os.environ.items() if key.startswith(("PREDICT_", "MODEL_"))}
+        },
+        "coalesce": results
+    }
+
+
+async def run_suite(args) -> dict:
+    # Enough distinct payloads that /predict never repeats one within a run
+    n_payloads = args.payloads or args.requests * len(args.concurrency) + WARMUP_REQUESTS
+    payloads = load_payloads(args.data, n_payloads, args.seed, unique=not args.repeat_inputs)
+    cursor = itertools.count()
+    results = {
+        "meta": {
+            "target": args.target,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "requests_per_level": args.requests,
+            "env": {key: value for key, value in os.environ.items() if key.startswith(("PREDICT_", "MODEL_"))}
+        },
+        "predict": {},
+        "batch": {}
+    }
+
+    server = None
+    lifespan = contextlib.nullcontext()
+    if args.target == "inprocess":
+        from app import app
+        # The ASGI transport doesn't send lifespan events, so run the app's startup and shutdown here
+        lifespan = app.router.lifespan_context(app)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark")
+    else:
+        server = start_uvicorn(args.port)
+        limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+        client = httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=60)
+
+    try:
+        async with lifespan, client:
+            # Warm up connections, caches and the model
+            await run_predict_level(client, payloads, cursor, min(8, max(args.concurrency)), WARMUP_REQUESTS)
+
+            for concurrency in args.concurrency:
+                summary = await run_predict_level(client, payloads, cursor, concurrency, args.requests)
+                results["predict"][f"concurrency={concurrency}"] = summary
+                print(f"/predict        c={concurrency:<4} p50 {summary['p50_ms']:8.2f} ms  p95 {summary['p95_ms']:8.2f} ms  "
+                      f"p99 {summary['p99_ms']:8.2f} ms  {summary['throughput_rps']:8.1f} req/s")
+
+            for batch_size in args.batch_sizes:
+                n_batches = max(3, min(args.requests // 10, args.requests * 10 // batch_size))
+                summary = await run_batch_level(client, payloads, batch_size, n_batches)
+                results["batch"][f"batch={batch_size}"] = summary
+                print(f"/predict/batch  n={batch_size:<5} p50 {summary['p50_ms']:8.2f} ms  p95 {summary['p95_ms']:8.2f} ms  "
+                      f"p99 {summary['p99_ms']:8.2f} ms  {summary['rows_per_second']:10.1f} rows/s")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    results["stages"] = stage_breakdown(payloads, args.batch_sizes, repeats=20)
+    for key, stage in results["stages"].items():
+        if key != "backend":
+            print(f"stages {key:<12} preprocess {stage['preprocess_ms']:8.3f} ms  forest {stage['forest_ms']:8.3f} ms")
+    return results
+
+
+# Metrics where a larger value is worse; everything else checked (throughput) is better when larger
+LOWER_IS_BETTER = ("mean_ms", "p50_ms", "p95_ms", "p99_ms", "preprocess_ms", "forest_ms",
+                   "import_ms", "ready_ms", "first_request_ms", "warm_request_ms", "cpu_ms_per_10k")
+HIGHER_IS_BETTER = ("throughput_rps", "rows_per_second")
+
+
+def flatten(results: dict) -> dict:
+    """{"predict.concurrency=1.p99_ms": value, ...} for every comparable metric"""
+    flat = {}
+    for section in ("predict", "batch", "stages", "startup", "encoding", "coalesce"):
+        for level, metrics in results.get(section, {}).items():
+            if isinstance(metrics, dict):
+                for metric, value in metrics.items():
+                    if metric in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+                        flat[f"{section}.{level}.{metric}"] = value
+    return flat
+
+
+def compare(old: dict, new: dict, threshold: float) -> list:
+    """Metrics that got worse by more than threshold (relative) between two runs"""
+    old_flat, new_flat = flatten(old), flatten(new)
+    regressions = []
+    for key in sorted(old_flat.keys() & new_flat.keys()):
+        before, after = old_flat[key], new_flat[key]
+        if before == 0:
+            continue
+        change = (after - before) / before
+        worse = change > threshold if key.rsplit('.', 1)[1] in LOWER_IS_BETTER else change < -threshold
+        regressions.append({"metric": key, "before": before, "after": after, "change": change, "regression": worse})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Insurance Premium Prediction API")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="Run the benchmark suite")
+    run.add_argument("--target", choices=("inprocess", "uvicorn"), default="inprocess")
+    run.add_argument("--port", type=int, default=8765, help="Port for --target uvicorn")
+    run.add_argument("--data", default="insurance_premium_dataset.csv")
+    run.add_argument("--payloads", type=int, help="Distinct synthetic payloads to draw (default: one per request)")
+    run.add_argument("--requests", type=int, default=1000, help="Requests per concurrency level")
+    run.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    run.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000])
+    run.add_argument("--repeat-inputs", action="store_true", help="Don't jitter payloads (lets the cache hit)")
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--output", help="Write results as JSON to this file")
+
+    startup = subparsers.add_parser("startup", help="Measure cold-start import, ready and first-request times")
+    startup.add_argument("--runs", type=int, default=5, help="Fresh servers to start")
+    startup.add_argument("--port", type=int, default=8765)
+    startup.add_argument("--data", default="insurance_premium_dataset.csv")
+    startup.add_argument("--requests", type=int, default=20, help="/predict requests sent to each server")
+    startup.add_argument("--seed", type=int, default=42)
+    startup.add_argument("--output", help="Write results as JSON to this file")
+
+    encoding = subparsers.add_parser("encoding", help="Measure server CPU and bytes per 10k predictions per encoding")
+    encoding.add_argument("--port", type=int, default=8765)
+    encoding.add_argument("--data", default="insurance_premium_dataset.csv")
+    encoding.add_argument("--predictions", type=int, default=10000, help="Predictions scored in each encoding")
+    encoding.add_argument("--batch-size", type=int, default=100, help="Rows per /predict/batch request")
+    encoding.add_argument("--encodings", nargs="+", choices=ENCODINGS, default=list(ENCODINGS),
+                          help="Encodings to measure; CPU savings are reported relative to the first")
+    encoding.add_argument("--seed", type=int, default=42)
+    encoding.add_argument("--output", help="Write results as JSON to this file")
+
+    coalesce = subparsers.add_parser("coalesce", help="Measure coalescing of identical concurrent /predict requests")
+    coalesce.add_argument("--data", default="insurance_premium_dataset.csv")
+    coalesce.add_argument("--bursts", type=int, default=50)
+    coalesce.add_argument("--burst-size", type=int, default=64, help="Concurrent requests per burst")
+    coalesce.add_argument("--distinct", type=int, default=4, help="Distinct inputs among each burst's requests")
+    coalesce.add_argument("--seed", type=int, default=42)
+    coalesce.add_argument("--output", help="Write results as JSON to this file")
+
+    cmp = subparsers.add_parser("compare", help="Flag regressions between two result files")
+    cmp.add_argument("baseline")
+    cmp.add_argument("candidate")
+    cmp.add_argument("--threshold", type=float, default=0.10, help="Relative change counted as a regression")
+
+    args = parser.parse_args()
+
+    if args.command in ("run", "startup", "encoding", "coalesce"):
+        if args.command == "run":
+            results = asyncio.run(run_suite(args))
+        elif args.command == "coalesce":
+            results = asyncio.run(run_coalesce(args))
+        else:
+            results = run_startup(args) if args.command == "startup" else run_encoding(args)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2)
+            print(f"📄 Results written to {args.output}")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    rows = compare(baseline, candidate, args.threshold)
+    for row in rows:
+        flag = "❌ REGRESSION" if row["regression"] else ""
+        print(f"{row['metric']:<45} {row['before']:12.3f} -> {row['after']:12.3f} ({row['change']:+7.1%}) {flag}")
+    regressions = [row for row in rows if row["regression"]]
+    print(f"{'❌' if regressions else '✅'} {len(regressions)} regression(s) above {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
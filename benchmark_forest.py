@@ -0,0 +1,67 @@
+"""Compare batch latency of the sklearn forest and the packed forest's two walks.
+
+"level walk" is the vectorized walk alone; "packed" is PackedForest.predict_proba,
+which hands batches of compiled_min_rows rows or more to the compiled tree walk.
+
+Usage: python benchmark_forest.py [--repeats N]
+"""
+import argparse
+import pickle
+import time
+import numpy as np
+
+from fast_engine import FastPathEngine
+from feature_schema import TARGET, read_training_csv
+from packed_forest import PackedForest
+
+
+def time_call(fn, repeats: int) -> float:
+    """Median wall-clock time of fn() in milliseconds"""
+    fn()  # warm-up
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default="insurance_model.pkl")
+    parser.add_argument("--data", default="insurance_premium_dataset.csv")
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    with open(args.model, 'rb') as f:
+        pipeline = pickle.load(f)
+
+    df = read_training_csv(args.data)
+    rows = df.drop(columns=[TARGET]).to_dict(orient='records')
+
+    fast = FastPathEngine.from_pipeline(pipeline)
+    forest = fast.classifier
+    packed = PackedForest.from_forest(forest)
+
+    features = fast.encoder.transform(rows)
+
+    diff = np.abs(packed.predict_proba(features) - forest.predict_proba(features)).max()
+    print(f"🌲 {packed.n_trees} trees, {packed.n_nodes} nodes, max depth {packed.max_depth}")
+    print(f"🎯 Max abs probability difference vs sklearn: {diff:.2e}")
+
+    level_walk = PackedForest(packed.feature, packed.threshold, packed.children, packed.value, packed.roots,
+                              packed.max_depth)
+    level_walk.compiled_min_rows = np.inf
+
+    print(f"{'batch':>10} {'sklearn (ms)':>14} {'level walk (ms)':>16} {'packed (ms)':>14} {'speedup':>9}")
+    for n_rows in (1, 100, 1000, 20000):
+        X = features[np.arange(n_rows) % len(features)]
+        repeats = args.repeats if n_rows <= 1000 else max(3, args.repeats // 10)
+        sklearn_ms = time_call(lambda: forest.predict_proba(X), repeats)
+        walk_ms = time_call(lambda: level_walk.predict_proba(X), repeats)
+        packed_ms = time_call(lambda: packed.predict_proba(X), repeats)
+        print(f"{n_rows:>5} rows {sklearn_ms:>14.3f} {walk_ms:>16.3f} {packed_ms:>14.3f} {sklearn_ms / packed_ms:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Fast-path inference engine that bypasses pandas and the ColumnTransformer.
+
+The StandardScaler means/scales and OneHotEncoder category tables are pulled
+out of the trained pipeline once into plain NumPy arrays and dict lookups.
+Validated rows are then written straight into a NumPy feature matrix laid out
+exactly like the ColumnTransformer output and handed to the classifier.
+
+sklearn is only imported when an engine is built from a trained pipeline, so
+serving a model artifact doesn't load it at all.
+"""
+import math
+import numpy as np
+
+
+class UnsupportedPipelineError(ValueError):
+    """Raised when a pipeline's structure can't be reproduced by the fast path"""
+
+
+# OneHotEncoder stores missing categories (None or NaN) as a single NaN entry
+_MISSING = object()
+
+
+def _category_key(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return _MISSING
+    return value
+
+
+def _is_schema_encoder(transformer) -> bool:
+    """Whether transformer is feature_schema's categorical branch: uint8 codes, then OneHotEncoder"""
+    from sklearn.preprocessing import OneHotEncoder
+    from feature_schema import encode_categories
+
+    steps = getattr(transformer, 'steps', None)
+    return bool(steps) and len(steps) == 2 and getattr(steps[0][1], 'func', None) is encode_categories \
+        and isinstance(steps[1][1], OneHotEncoder)
+
+
+class FeatureEncoder:
+    """Precomputed scaling and one-hot tables reproducing the training preprocessor"""
+
+    def __init__(self, numeric_columns, numeric_positions, mean, scale,
+                 categorical_columns, categories, category_offsets, n_features):
+        self.numeric_columns = list(numeric_columns)
+        self.numeric_positions = np.asarray(numeric_positions, dtype=np.intp)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.categorical_columns = list(categorical_columns)
+        self.categories = [list(cats) for cats in categories]
+        self.category_offsets = [int(offset) for offset in category_offsets]
+        self.n_features = int(n_features)
+
+        # Per categorical column: category value -> column index in the feature matrix
+        self.lookups = [
+            {_category_key(value): offset + i for i, value in enumerate(cats)}
+            for cats, offset in zip(self.categories, self.category_offsets)
+        ]
+
+        # Input column each feature matrix column comes from, as an index into self.columns
+        self.columns = self.numeric_columns + self.categorical_columns
+        self.feature_columns = np.zeros(self.n_features, dtype=np.intp)
+        self.feature_columns[self.numeric_positions] = np.arange(len(self.numeric_columns))
+        for i, (cats, offset) in enumerate(zip(self.categories, self.category_offsets)):
+            self.feature_columns[offset:offset + len(cats)] = len(self.numeric_columns) + i
+
+    @classmethod
+    def from_preprocessor(cls, preprocessor):
+        """Extract lookup tables from a fitted ColumnTransformer"""
+        from sklearn.compose import ColumnTransformer
+        from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+        if not isinstance(preprocessor, ColumnTransformer):
+            raise UnsupportedPipelineError(f"Expected a ColumnTransformer, got {type(preprocessor).__name__}")
+
+        numeric_columns, numeric_positions, means, scales = [], [], [], []
+        categorical_columns, categories, category_offsets = [], [], []
+        offset = 0
+        for name, transformer, columns in preprocessor.transformers_:
+            if transformer == 'drop' or len(columns) == 0:
+                continue
+            if not all(isinstance(column, str) for column in columns):
+                raise UnsupportedPipelineError(f"Transformer '{name}' must select columns by name")
+
+            if isinstance(transformer, StandardScaler):
+                n = len(columns)
+                numeric_columns.extend(columns)
+                numeric_positions.extend(range(offset, offset + n))
+                means.extend(transformer.mean_ if transformer.with_mean else np.zeros(n))
+                scales.extend(transformer.scale_ if transformer.with_std else np.ones(n))
+                offset += n
+            elif isinstance(transformer, OneHotEncoder) or _is_schema_encoder(transformer):
+                vocabularies = None
+                if not isinstance(transformer, OneHotEncoder):
+                    # feature_schema codes followed by a one-hot encoding of the codes: the
+                    # vocabularies give the category each code stands for
+                    from feature_schema import CATEGORIES
+                    vocabularies = [CATEGORIES[column] for column in columns]
+                    transformer = transformer.steps[-1][1]
+                if transformer.drop is not None or transformer.handle_unknown != 'ignore':
+                    raise UnsupportedPipelineError("OneHotEncoder must use drop=None and handle_unknown='ignore'")
+                if transformer.min_frequency is not None or transformer.max_categories is not None:
+                    raise UnsupportedPipelineError("OneHotEncoder infrequent categories are not supported")
+                for i, (column, cats) in enumerate(zip(columns, transformer.categories_)):
+                    if vocabularies is not None:
+                        if not np.array_equal(cats, np.arange(len(vocabularies[i]))):
+                            raise UnsupportedPipelineError(f"Codes of '{column}' don't match its schema vocabulary")
+                        cats = vocabularies[i]
+                    categorical_columns.append(column)
+                    categories.append(cats)
+                    category_offsets.append(offset)
+                    offset += len(cats)
+            else:
+                raise UnsupportedPipelineError(f"Unsupported transformer '{name}': {type(transformer).__name__}")
+
+        return cls(numeric_columns, numeric_positions, means, scales,
+                   categorical_columns, categories, category_offsets, offset)
+
+    def transform(self, rows: list) -> np.ndarray:
+        """Encode rows (dicts keyed by training column names) into a feature matrix"""
+        X = np.zeros((len(rows), self.n_features), dtype=np.float64)
+
+        if self.numeric_columns:
+            numeric = np.array([[row[column] for column in self.numeric_columns] for row in rows], dtype=np.float64)
+            numeric -= self.mean
+            numeric /= self.scale
+            X[:, self.numeric_positions] = numeric
+
+        if self.categorical_columns:
+            # Feature matrix column of every (row, categorical column), -1 for unknown categories,
+            # which encode as all zeros like handle_unknown='ignore'
+            positions = np.array([
+                [lookup.get(_category_key(row[column]), -1) for column, lookup in zip(self.categorical_columns, self.lookups)]
+                for row in rows
+            ], dtype=np.intp).reshape(len(rows), len(self.categorical_columns))
+            row_index, column_index = np.nonzero(positions >= 0)
+            X[row_index, positions[row_index, column_index]] = 1.0
+        return X
+
+    def group_features(self, values: np.ndarray) -> np.ndarray:
+        """Sum per-feature values (axis 1) into per-input-column values, in the order of self.columns"""
+        grouped = np.zeros((values.shape[0], len(self.columns)) + values.shape[2:])
+        np.add.at(grouped, (slice(None), self.feature_columns), values)
+        return grouped
+
+
+class FastPathEngine:
+    """Scores rows with precomputed preprocessing tables and the bare classifier"""
+    name = "fast"
+
+    def __init__(self, encoder: FeatureEncoder, classifier):
+        self.encoder = encoder
+        self.classifier = classifier
+        # Packed copy of the forest used for explanations, built on first use
+        self._explainer = None
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        """Build the engine from a trained (Imb)Pipeline, or raise UnsupportedPipelineError"""
+        steps = getattr(pipeline, 'steps', None)
+        if not steps or len(steps) < 2:
+            raise UnsupportedPipelineError("Expected a pipeline with a preprocessor and a classifier")
+
+        # Samplers such as SMOTE only run during fit, so they can be skipped at predict time
+        for name, step in steps[1:-1]:
+            if not hasattr(step, 'fit_resample'):
+                raise UnsupportedPipelineError(f"Unsupported intermediate step '{name}'")
+
+        encoder = FeatureEncoder.from_preprocessor(steps[0][1])
+        classifier = steps[-1][1]
+        if not hasattr(classifier, 'predict_proba'):
+            raise UnsupportedPipelineError("Classifier does not support predict_proba")
+        if getattr(classifier, 'n_features_in_', encoder.n_features) != encoder.n_features:
+            raise UnsupportedPipelineError(
+                f"Classifier expects {classifier.n_features_in_} features, encoder produces {encoder.n_features}"
+            )
+        return cls(encoder, classifier)
+
+    @property
+    def classes_(self):
+        return self.classifier.classes_
+
+    def encode(self, rows: list) -> np.ndarray:
+        """Preprocessing stage: rows to the classifier's feature matrix"""
+        return self.encoder.transform(rows)
+
+    def predict_proba_features(self, X: np.ndarray) -> np.ndarray:
+        """Model stage: class probabilities for an encoded feature matrix"""
+        return self.classifier.predict_proba(X)
+
+    def predict_proba_rows(self, rows: list) -> np.ndarray:
+        return self.predict_proba_features(self.encode(rows))
+
+    def explain_rows(self, rows: list):
+        """Tree-path attributions, see packed_forest.PackedForestEngine.explain_rows"""
+        if self._explainer is None:
+            from packed_forest import PackedForest, PackedForestEngine
+            self._explainer = PackedForestEngine(self.encoder, PackedForest.from_forest(self.classifier), self.classes_)
+        return self._explainer.explain_rows(rows)
+
@@ -0,0 +1,101 @@
+"""Feature schema shared by training and serving.
+
+Every input column and every categorical column's vocabulary is defined here
+once. The API builds its validation rules from it, and training encodes
+categorical columns into uint8 codes into these vocabularies (a vectorized
+pandas Categorical pass) before one-hot encoding the codes, instead of letting
+OneHotEncoder discover and hash the strings. A model trained this way has
+exactly these categories, in this order, so the API can't accept a value the
+model has never been given a column for, or the other way round.
+
+Vocabularies are kept sorted, the order OneHotEncoder would use, so the
+feature layout matches a model trained on the raw strings.
+
+Only numpy is imported at module level; pandas and sklearn are imported by
+the training-side helpers that need them.
+"""
+import numpy as np
+
+# Numeric input columns, in training column order
+NUMERIC_COLUMNS = (
+    'age', 'monthly_income', 'bmi', 'physical_activity_hr_wk', 'sleep_hr_day', 'doctor_visits_last_year',
+    'current_medications', 'claim_history', 'claim_amount_last_year', 'policy_tenure', 'premium_paid_last_year',
+    'loyalty_score'
+)
+
+# Vocabulary of every categorical input column, in training column order
+CATEGORIES = {
+    'gender': ('Female', 'Male', 'Other'),
+    'marital_status': ('Divorced', 'Married', 'Single', 'Widowed'),
+    'occupation': ('Construction Worker', 'Doctor', 'Farmer', 'Freelancer', 'Private Job', 'Student', 'Teacher',
+                   'Unemployed'),
+    'education': ('Bachelor', 'HSC', 'Master', 'None', 'PhD', 'Primary', 'SSC'),
+    'area_type': ('Rural', 'Semi-urban', 'Urban'),
+    'smoking_status': ('Current', 'Former', 'Never'),
+    'alcohol_consumption': ('Never', 'Occasional', 'Regular'),
+    'family_history': ('No', 'Yes'),
+    'preexisting_condition': ('Asthma', 'Diabetes', 'Heart Disease', 'Hypertension', 'None'),
+    'stress_level': ('High', 'Low', 'Moderate'),
+    'pollution_exposure': ('High', 'Low', 'Moderate'),
+    'food_habit': ('Home-cooked', 'Mixed', 'Mostly Restaurant'),
+    'insurance_type': ('Basic', 'Comprehensive', 'Critical Illness', 'Family')
+}
+CATEGORICAL_COLUMNS = tuple(CATEGORIES)
+
+TARGET = 'premium_category'
+
+# Seed of the train/validation split and the models, shared so every training script splits alike
+RANDOM_STATE = 42
+
+# Code of values outside a column's vocabulary (and of missing values); one-hot encodes to all zeros
+UNKNOWN_CODE = np.iinfo(np.uint8).max
+
+# pandas.read_csv options for training data: only empty cells are missing. "None" is a
+# category (no education, no preexisting condition), just as the API receives it.
+CSV_OPTIONS = {"keep_default_na": False, "na_values": [""]}
+
+
+def normalize_columns(df):
+    """Training column names from CSV headers ("Monthly Income" -> "monthly_income")"""
+    df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_')
+    return df
+
+
+def read_training_csv(path, **kwargs):
+    """Read a CSV shaped like insurance_premium_dataset.csv with normalized column names"""
+    import pandas as pd
+    return normalize_columns(pd.read_csv(path, **CSV_OPTIONS, **kwargs))
+
+
+def load_dataset(path):
+    """Features and target of a training CSV, read as in model_train.py"""
+    df = read_training_csv(path)
+    return df.drop(columns=[TARGET]), df[TARGET]
+
+
+def encode_categories(X) -> np.ndarray:
+    """uint8 codes of a DataFrame's categorical columns into their vocabularies, UNKNOWN_CODE if not in it"""
+    import pandas as pd
+    codes = np.empty(X.shape, dtype=np.uint8)
+    for i, column in enumerate(X.columns):
+        codes[:, i] = pd.Categorical(X[column], categories=CATEGORIES[column]).codes.astype(np.uint8)
+    return codes
+
+
+def build_preprocessor():
+    """Scaler for the numeric columns and one-hot encoding of the categorical columns' codes"""
+    from sklearn.compose import ColumnTransformer
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import FunctionTransformer, OneHotEncoder, StandardScaler
+
+    categorical = Pipeline([
+        ('codes', FunctionTransformer(encode_categories)),
+        ('onehot', OneHotEncoder(
+            categories=[np.arange(len(CATEGORIES[column]), dtype=np.uint8) for column in CATEGORICAL_COLUMNS],
+            handle_unknown='ignore'
+        ))
+    ])
+    return ColumnTransformer([
+        ('num', StandardScaler(), list(NUMERIC_COLUMNS)),
+        ('cat', categorical, list(CATEGORICAL_COLUMNS))
+    ])
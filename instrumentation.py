@@ -0,0 +1,354 @@
+"""Hot-path latency metrics in Prometheus text format, plus sampled profiling.
+
+Kept dependency-free: a few thread-safe counters, gauges and histograms that
+render themselves in the Prometheus exposition format for GET /metrics.
+"""
+import cProfile
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from 50µs to 5s
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(name, documentation, labels)
+        self._values = {}
+
+    def inc(self, *label_values, amount: float = 1.0):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values) -> float:
+        with self._lock:
+            return self._values.get(label_values, 0.0)
+
+    def snapshot(self) -> list:
+        """[[label values, value], ...], JSON-serializable"""
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def merged(self, snapshots=()) -> dict:
+        """This metric's values plus those of other processes' snapshots"""
+        with self._lock:
+            values = dict(self._values)
+        for snapshot in snapshots:
+            for key, value in snapshot:
+                values[tuple(key)] = values.get(tuple(key), 0.0) + value
+        return values
+
+    def render(self, snapshots=()) -> list:
+        values = self.merged(snapshots)
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labels, key)} {value}" for key, value in sorted(values.items())
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *label_values, amount: float = 1.0):
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def totals(self, *label_values) -> tuple:
+        """(count, sum) of the observations of one label set"""
+        with self._lock:
+            series = self._series.get(label_values)
+            return (series[-1], series[-2]) if series is not None else (0, 0.0)
+
+    @contextmanager
+    def time(self, *label_values):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def snapshot(self) -> list:
+        """[[label values, [bucket counts..., sum, count]], ...], JSON-serializable"""
+        with self._lock:
+            return [[list(key), list(series)] for key, series in self._series.items()]
+
+    def merged(self, snapshots=()) -> dict:
+        """This histogram's series plus those of other processes' snapshots"""
+        with self._lock:
+            merged = {key: list(series) for key, series in self._series.items()}
+        for snapshot in snapshots:
+            for key, series in snapshot:
+                key = tuple(key)
+                merged[key] = [a + b for a, b in zip(merged[key], series)] if key in merged else list(series)
+        return merged
+
+    def render(self, snapshots=()) -> list:
+        lines = self.header()
+        for key, series in sorted(self.merged(snapshots).items()):
+            for bound, count in zip(self.buckets, series):
+                labels = _format_labels(self.labels, key, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labels, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {series[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {series[-1]}")
+        return lines
+
+
+class MetricsMiddleware:
+    """ASGI middleware counting requests, errors and in-flight requests and timing each request.
+
+    Stores the arrival time in request.state.received_at so handlers can time
+    the body parsing and validation that happens before they run.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        scope.setdefault("state", {})["received_at"] = start
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            IN_FLIGHT.dec()
+            # Label by route template to keep label cardinality bounded
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            REQUESTS.inc(path, scope["method"], str(status))
+            if status >= 500:
+                ERRORS.inc(path)
+            REQUEST_LATENCY.observe(time.perf_counter() - start, path)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def snapshot(self) -> dict:
+        """{metric name: samples} of every metric, JSON-serializable"""
+        return {metric.name: metric.snapshot() for metric in self._metrics}
+
+    def render(self, snapshots=()) -> str:
+        """Exposition text of every metric, summed with other processes' registry snapshots"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render([snapshot.get(metric.name, []) for snapshot in snapshots]))
+        return "\n".join(lines) + "\n"
+
+    def without_gauges(self, snapshot: dict) -> dict:
+        gauges = {metric.name for metric in self._metrics if metric.kind == "gauge"}
+        return {name: samples for name, samples in snapshot.items() if name not in gauges}
+
+
+class SharedMetrics:
+    """Metrics of every pre-forked worker, merged into whichever worker answers GET /metrics.
+
+    Each worker writes a snapshot of its registry to <directory>/<pid>.json
+    every `interval` seconds, and /metrics adds the other workers' latest
+    snapshots to this worker's own metrics, so every scrape sees totals for the
+    whole server instead of one random worker's counters. Counters and
+    histograms of workers that have exited stay in the totals, so they never
+    go backwards; their gauges are left out. Without a directory (a single
+    process) only this process's metrics are rendered.
+    """
+
+    def __init__(self, registry: Registry, directory: str = None, interval: float = 1.0):
+        self.registry = registry
+        self.directory = directory
+        self.interval = interval
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    def write(self):
+        """Replace this worker's snapshot file (atomically, so readers never see half of it)"""
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.registry.snapshot(), f)
+        os.replace(path + ".tmp", path)
+
+    def other_snapshots(self) -> list:
+        snapshots = []
+        for name in os.listdir(self.directory):
+            pid, extension = os.path.splitext(name)
+            if extension != ".json" or not pid.isdigit() or int(pid) == os.getpid():
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            snapshots.append(snapshot if _process_exists(int(pid)) else self.registry.without_gauges(snapshot))
+        return snapshots
+
+    def render(self) -> str:
+        if not self.enabled:
+            return self.registry.render()
+        return self.registry.render(self.other_snapshots())
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-snapshot", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the snapshot thread after writing a last snapshot"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.write()
+
+    def _run(self):
+        while True:
+            try:
+                self.write()
+            except OSError as e:
+                print(f"⚠️ Could not write the metrics snapshot of worker {os.getpid()}: {e}")
+            if self._stop.wait(self.interval):
+                return
+
+
+def _process_exists(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class ProfileSampler:
+    """Profiles 1 in every `sample_every` calls with cProfile and dumps the stats to output_dir.
+
+    sample_every=0 disables sampling. sample_every can be changed at runtime;
+    output_dir is server configuration only, as it is where files get written.
+    """
+
+    def __init__(self, sample_every: int = 0, output_dir: str = "profiles"):
+        self.sample_every = sample_every
+        self.output_dir = output_dir
+        self.dumped = 0
+        self._counter = itertools.count(1)
+
+    def configure(self, sample_every: int):
+        self.sample_every = sample_every
+
+    def should_sample(self) -> bool:
+        return self.sample_every > 0 and next(self._counter) % self.sample_every == 0
+
+    def run(self, name: str, fn, *args):
+        """Call fn(*args) under cProfile and write <output_dir>/<name>-<pid>-<ns>.prof"""
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(fn, *args)
+        finally:
+            os.makedirs(self.output_dir, exist_ok=True)
+            profile.dump_stats(os.path.join(self.output_dir, f"{name}-{os.getpid()}-{time.time_ns()}.prof"))
+            self.dumped += 1
+
+    def status(self) -> dict:
+        return {"sample_every": self.sample_every, "output_dir": self.output_dir, "profiles_dumped": self.dumped}
+
+
+# Metrics of the prediction API; under `serve --workers N`, serve.py gives shared_metrics a directory
+registry = Registry()
+shared_metrics = SharedMetrics(registry)
+REQUESTS = registry.register(Counter(
+    "insurance_api_requests_total", "HTTP requests handled", ("path", "method", "status")))
+ERRORS = registry.register(Counter(
+    "insurance_api_errors_total", "HTTP requests that failed with a 5xx status or an unhandled exception", ("path",)))
+IN_FLIGHT = registry.register(Gauge(
+    "insurance_api_requests_in_flight", "HTTP requests currently being handled"))
+REQUEST_LATENCY = registry.register(Histogram(
+    "insurance_api_request_duration_seconds", "End-to-end HTTP request latency", ("path",)))
+STAGE_LATENCY = registry.register(Histogram(
+    "insurance_api_stage_duration_seconds", "Latency of each prediction hot-path stage", ("stage",)))
+BATCH_SIZE = registry.register(Histogram(
+    "insurance_api_model_batch_rows", "Rows scored per model call", (),
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 1024, 4096, 16384)))
+MODEL_LATENCY = registry.register(Histogram(
+    "insurance_api_model_scoring_seconds", "Scoring latency of each model call, per served model variant", ("variant",)))
+SHADOW_COMPARISONS = registry.register(Counter(
+    "insurance_api_shadow_comparisons_total", "Shadow predictions compared with the primary's, by label agreement",
+    ("variant", "agreement")))
+SHADOW_DRIFT = registry.register(Histogram(
+    "insurance_api_shadow_probability_drift", "Largest class probability difference between shadow and primary",
+    ("variant",), buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)))
+SHADOW_DROPPED = registry.register(Counter(
+    "insurance_api_shadow_dropped_total", "Requests not mirrored to the shadow model because its queue was full",
+    ("variant",)))
+COALESCED = registry.register(Counter(
+    "insurance_api_predict_coalesced_total",
+    "/predict requests answered by an identical request already being scored, instead of scoring again",
+    ("variant",)))
@@ -0,0 +1,210 @@
+"""Versioned, memory-mappable model artifact.
+
+An artifact is a directory holding the packed forest and the preprocessing
+tables as raw .npy buffers plus a manifest.json describing them:
+
+    insurance_model/
+    ├── manifest.json        # format version, model id, features, classes, data hash, metrics
+    ├── feature.npy          # packed forest node arrays (see packed_forest.PackedForest)
+    ├── threshold.npy
+    ├── children.npy
+    ├── value.npy
+    ├── roots.npy
+    ├── numeric_positions.npy  # StandardScaler tables (see fast_engine.FeatureEncoder)
+    ├── mean.npy
+    └── scale.npy
+
+The artifact path is a symlink to a hidden version directory next to it
+(.insurance_model-<model id>-<timestamp>/). Saving writes a new version and
+atomically repoints the symlink, so readers, the file watcher and restarting
+workers always find a complete model.
+
+Arrays are opened with np.load(mmap_mode='r'), so every worker process on a
+host shares the same pages through the OS page cache instead of holding its
+own unpickled copy of the forest.
+
+Compact artifacts (format version 2, written by model_compress.py) store the
+same arrays with narrower dtypes: int16/int32 indices, float32 thresholds and
+float16 or float32 leaf probabilities.
+"""
+from datetime import datetime, timezone
+import hashlib
+import json
+import os
+import shutil
+import time
+import numpy as np
+
+from fast_engine import FeatureEncoder, FastPathEngine, _MISSING
+from packed_forest import PackedForest, PackedForestEngine
+
+FORMAT_VERSION = 1
+# Compact artifacts store narrower array dtypes, which readers of version 1 don't expect
+COMPACT_FORMAT_VERSION = 2
+MANIFEST_FILE = "manifest.json"
+FOREST_ARRAYS = ("feature", "threshold", "children", "value", "roots")
+ENCODER_ARRAYS = ("numeric_positions", "mean", "scale")
+
+
+def file_sha256(path: str, limit: int = None) -> str:
+    """Hex SHA-256 of a file (or of its first `limit` bytes), used to record which training data produced a model"""
+    digest = hashlib.sha256()
+    remaining = limit
+    with open(path, 'rb') as f:
+        while remaining is None or remaining > 0:
+            block = f.read(1 << 20 if remaining is None else min(1 << 20, remaining))
+            if not block:
+                break
+            digest.update(block)
+            if remaining is not None:
+                remaining -= len(block)
+    return digest.hexdigest()
+
+
+def data_fingerprint(path: str, rows: int) -> dict:
+    """Size and hash of a training CSV, so a later incremental run can tell which rows were appended since"""
+    size = os.path.getsize(path)
+    return {"sha256": file_sha256(path, size), "bytes": size, "rows": int(rows)}
+
+
+def _json_category(value):
+    # Missing categories (None/NaN) are stored as JSON null
+    if value is _MISSING or value is None or (isinstance(value, float) and value != value):
+        return None
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def save_artifact(pipeline, path: str, data_hash: str = None, metrics: dict = None,
+                  training_data: dict = None, parent_model_id: str = None, value_dtype: str = None) -> dict:
+    """Export a trained pipeline as a model artifact directory and return its manifest.
+
+    training_data is a data_fingerprint() of the training CSV; parent_model_id
+    names the model an update or compression started from. With value_dtype
+    ("float32" or "float16") the forest is stored compactly, see PackedForest.compact.
+    """
+    engine = FastPathEngine.from_pipeline(pipeline)
+    encoder = engine.encoder
+    forest = PackedForest.from_forest(engine.classifier)
+    if value_dtype is not None:
+        forest = forest.compact(np.dtype(value_dtype))
+
+    arrays = {name: getattr(forest, name) for name in FOREST_ARRAYS}
+    arrays.update({name: getattr(encoder, name) for name in ENCODER_ARRAYS})
+
+    # The model id is a content hash, so it changes whenever the model does
+    model_digest = hashlib.sha256()
+    for name in sorted(arrays):
+        model_digest.update(name.encode())
+        model_digest.update(np.ascontiguousarray(arrays[name]).tobytes())
+    model_digest.update(json.dumps([str(cls) for cls in engine.classes_]).encode())
+
+    manifest = {
+        "format_version": FORMAT_VERSION if value_dtype is None else COMPACT_FORMAT_VERSION,
+        "model_id": model_digest.hexdigest()[:16],
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "classes": [str(cls) for cls in engine.classes_],
+        "numeric_columns": encoder.numeric_columns,
+        "categorical_columns": encoder.categorical_columns,
+        "categories": [[_json_category(value) for value in cats] for cats in encoder.categories],
+        "category_offsets": encoder.category_offsets,
+        "n_features": encoder.n_features,
+        "n_trees": forest.n_trees,
+        "n_nodes": forest.n_nodes,
+        "max_depth": forest.max_depth,
+        "training_data_sha256": data_hash or (training_data or {}).get("sha256"),
+        "training_data": training_data,
+        "parent_model_id": parent_model_id,
+        "compact": value_dtype is not None,
+        "metrics": metrics or {},
+        "arrays": {
+            name: {"file": f"{name}.npy", "dtype": str(array.dtype), "shape": list(array.shape)}
+            for name, array in arrays.items()
+        }
+    }
+
+    # Write a new version directory, then point path at it
+    version_path = _version_path(path, manifest["model_id"])
+    os.makedirs(version_path)
+    for name, array in arrays.items():
+        np.save(os.path.join(version_path, f"{name}.npy"), np.ascontiguousarray(array), allow_pickle=False)
+    with open(os.path.join(version_path, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    _publish(path, version_path)
+    return manifest
+
+
+def _version_path(path: str, label: str) -> str:
+    """A new hidden directory next to path for one saved version of it"""
+    parent, name = os.path.split(os.path.abspath(path))
+    return os.path.join(parent, f".{name}-{label}-{time.time_ns()}")
+
+
+def _publish(path: str, version_path: str):
+    """Atomically repoint the symlink at path to version_path.
+
+    Readers resolve path to either the previous version or the new one, never
+    to nothing, and a crash at any point leaves one of them in place. The
+    previous version is kept for readers still opening it; older ones are
+    deleted (processes that memory-mapped them keep their pages).
+    """
+    parent, name = os.path.split(os.path.abspath(path))
+    previous = None
+    if os.path.islink(path):
+        previous = os.path.basename(os.readlink(path))
+    elif os.path.isdir(path):
+        # An artifact saved as a plain directory: move it aside once so the symlink can take its place
+        previous = os.path.basename(_version_path(path, "unversioned"))
+        os.rename(path, os.path.join(parent, previous))
+
+    link = f"{path}.link-{os.getpid()}"
+    if os.path.lexists(link):
+        os.remove(link)
+    os.symlink(os.path.basename(version_path), link)
+    os.replace(link, path)
+
+    keep = {os.path.basename(version_path), previous}
+    for entry in os.listdir(parent):
+        if entry.startswith(f".{name}-") and entry not in keep:
+            shutil.rmtree(os.path.join(parent, entry), ignore_errors=True)
+
+
+def read_manifest(path: str) -> dict:
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") not in (FORMAT_VERSION, COMPACT_FORMAT_VERSION):
+        raise ValueError(f"Unsupported model artifact format version {manifest.get('format_version')}")
+    return manifest
+
+
+def load_artifact(path: str, mmap: bool = True) -> PackedForestEngine:
+    """Open a model artifact as a packed-forest engine, memory-mapping its arrays"""
+    manifest = read_manifest(path)
+    mmap_mode = 'r' if mmap else None
+
+    arrays = {}
+    for name, spec in manifest["arrays"].items():
+        array = np.load(os.path.join(path, spec["file"]), mmap_mode=mmap_mode, allow_pickle=False)
+        if str(array.dtype) != spec["dtype"] or list(array.shape) != spec["shape"]:
+            raise ValueError(f"Array '{name}' does not match the manifest")
+        arrays[name] = array
+
+    encoder = FeatureEncoder(
+        numeric_columns=manifest["numeric_columns"],
+        numeric_positions=arrays["numeric_positions"],
+        mean=arrays["mean"],
+        scale=arrays["scale"],
+        categorical_columns=manifest["categorical_columns"],
+        categories=manifest["categories"],
+        category_offsets=manifest["category_offsets"],
+        n_features=manifest["n_features"]
+    )
+    forest = PackedForest(
+        feature=arrays["feature"],
+        threshold=arrays["threshold"],
+        children=arrays["children"],
+        value=arrays["value"],
+        roots=arrays["roots"],
+        max_depth=manifest["max_depth"]
+    )
+    return PackedForestEngine(encoder, forest, manifest["classes"], manifest=manifest)
+
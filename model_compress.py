@@ -0,0 +1,214 @@
+"""Compact model variant for low-memory serving.
+
+Shrinks the trained forest in two steps:
+
+1. Pruning: trees are picked greedily, each time adding the tree that brings
+   the subset's probabilities closest to the full forest's on the training
+   rows, until the subset's macro F1 on the held-out rows model_train.py
+   evaluates on is within --tolerance of the full forest's.
+2. Quantization: the pruned forest is written as a compact artifact with
+   int16 feature indices, int32 node indices, float32 thresholds (rounded so
+   every split decision is unchanged) and float16 or float32 leaf
+   probabilities.
+
+The API serves the result like any other artifact (MODEL_PATH=insurance_model_compact),
+and a report compares size, load time, latency and accuracy with the full model.
+
+Usage:
+    python model_compress.py --tolerance 0.005 --value-dtype float16
+"""
+import argparse
+import copy
+import json
+import os
+import pickle
+import tempfile
+import time
+import numpy as np
+
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.model_selection import train_test_split
+
+from fast_engine import FastPathEngine
+from feature_schema import RANDOM_STATE, load_dataset
+from model_artifact import load_artifact, save_artifact
+from packed_forest import PackedForest
+
+
+def macro_f1_batch(predictions: np.ndarray, y: np.ndarray, n_classes: int) -> np.ndarray:
+    """Macro F1 of every row of predictions (n_candidates, n_rows) against y, like f1_score(average='macro')"""
+    scores = np.zeros(len(predictions))
+    for c in range(n_classes):
+        predicted, actual = predictions == c, (y == c)[np.newaxis, :]
+        tp = (predicted & actual).sum(axis=1)
+        denominator = predicted.sum(axis=1) + actual.sum()
+        scores += np.where(denominator > 0, 2 * tp / np.maximum(denominator, 1), 0.0)
+    return scores / n_classes
+
+
+def select_trees(fit_proba: np.ndarray, val_proba: np.ndarray, y_val: np.ndarray,
+                 tolerance: float, min_trees: int = 1) -> tuple:
+    """Greedy forward selection of trees; returns (selected tree indices, full F1, subset F1).
+
+    fit_proba and val_proba hold every tree's class probabilities on the
+    training and held-out rows, shape (n_trees, n_rows, n_classes). Each step
+    adds the tree that brings the subset's probabilities closest to the full
+    forest's on the training rows, which needs no labels and so cannot overfit
+    them; selection stops once the held-out macro F1 is within tolerance.
+    """
+    n_trees, _, n_classes = val_proba.shape
+    target = fit_proba.mean(axis=0)
+    full_f1 = macro_f1_batch(val_proba.sum(axis=0).argmax(axis=1)[np.newaxis], y_val, n_classes)[0]
+
+    selected, remaining = [], list(range(n_trees))
+    fit_total = np.zeros(fit_proba.shape[1:])
+    val_total = np.zeros(val_proba.shape[1:])
+    while remaining:
+        k = len(selected) + 1
+        errors = ((fit_total[np.newaxis] + fit_proba[remaining]) / k - target[np.newaxis]) ** 2
+        tree = remaining.pop(int(errors.sum(axis=(1, 2)).argmin()))
+        selected.append(tree)
+        fit_total += fit_proba[tree]
+        val_total += val_proba[tree]
+        subset_f1 = macro_f1_batch(val_total.argmax(axis=1)[np.newaxis], y_val, n_classes)[0]
+        if k >= min_trees and subset_f1 >= full_f1 - tolerance:
+            break
+    return sorted(selected), float(full_f1), float(subset_f1)
+
+
+def directory_size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def median_ms(fn, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+def profile_artifact(path: str, rows: list, repeats: int) -> dict:
+    """Load time (including the first prediction), forest memory and scoring latency of an artifact"""
+    start = time.perf_counter()
+    engine = load_artifact(path)
+    engine.predict_proba_rows(rows[:1])
+    load_ms = (time.perf_counter() - start) * 1000
+    batch = (rows * (1000 // len(rows) + 1))[:1000]
+    forest = engine.forest
+    return {
+        "size_bytes": directory_size(path),
+        "forest_bytes": sum(getattr(forest, name).nbytes for name in ("feature", "threshold", "children", "value", "roots")),
+        "load_ms": load_ms,
+        "latency_1_row_ms": median_ms(lambda: engine.predict_proba_rows(rows[:1]), repeats),
+        "latency_1000_rows_ms": median_ms(lambda: engine.predict_proba_rows(batch), max(3, repeats // 10)),
+        "n_trees": forest.n_trees,
+        "n_nodes": forest.n_nodes
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prune and quantize the premium model for low-memory serving")
+    parser.add_argument("--data", default="insurance_premium_dataset.csv")
+    parser.add_argument("--model-path", default="insurance_model.pkl", help="Pickled pipeline to compress")
+    parser.add_argument("--output", default="insurance_model_compact", help="Compact artifact directory")
+    parser.add_argument("--tolerance", type=float, default=0.005,
+                        help="Largest allowed drop in validation macro F1 from pruning")
+    parser.add_argument("--min-trees", type=int, default=10,
+                        help="Keep at least this many trees")
+    parser.add_argument("--value-dtype", choices=("float16", "float32"), default="float16",
+                        help="Storage type of leaf probabilities")
+    parser.add_argument("--report", default="compress_report.json")
+    parser.add_argument("--repeats", type=int, default=200, help="Timing repetitions for the latency comparison")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    with open(args.model_path, 'rb') as f:
+        pipeline = pickle.load(f)
+    pickle_load_ms = (time.perf_counter() - start) * 1000
+
+    # Same split as model_train.py
+    X, y = load_dataset(args.data)
+    X_train, X_val, _, y_val = train_test_split(X, y, test_size=0.2, stratify=y, random_state=RANDOM_STATE)
+    rows = X_val.to_dict(orient='records')
+
+    engine = FastPathEngine.from_pipeline(pipeline)
+    classifier = engine.classifier
+    y_index = np.searchsorted(classifier.classes_, y_val.to_numpy())
+
+    # Every tree's leaf probabilities, from one pass over the packed forest per split
+    forest = PackedForest.from_forest(classifier)
+    fit_proba = forest.value.take(forest.apply(engine.encode(X_train.to_dict(orient='records'))), axis=0)
+    val_proba = forest.value.take(forest.apply(engine.encode(rows)), axis=0)
+    selected, full_f1, subset_f1 = select_trees(fit_proba, val_proba, y_index, args.tolerance, args.min_trees)
+    print(f"✂️ Kept {len(selected)} of {forest.n_trees} trees "
+          f"(validation macro F1 {full_f1:.4f} -> {subset_f1:.4f}, tolerance {args.tolerance})")
+
+    pruned = copy.deepcopy(pipeline)
+    pruned_classifier = pruned.named_steps['classifier']
+    pruned_classifier.estimators_ = [classifier.estimators_[i] for i in selected]
+    pruned_classifier.n_estimators = len(selected)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # The full model as a regular artifact, for the comparison. Model ids are content
+        # hashes, so its id is the one any artifact exported from this pickle has.
+        full_path = os.path.join(tmp, "full")
+        parent_id = save_artifact(pipeline, full_path)["model_id"]
+        manifest = save_artifact(
+            pruned,
+            args.output,
+            metrics={"validation_macro_f1": subset_f1, "full_validation_macro_f1": full_f1},
+            parent_model_id=parent_id,
+            value_dtype=args.value_dtype
+        )
+
+        full_profile = profile_artifact(full_path, rows, args.repeats)
+        compact_profile = profile_artifact(args.output, rows, args.repeats)
+
+        full_proba = load_artifact(full_path).predict_proba_rows(rows)
+        compact_proba = load_artifact(args.output).predict_proba_rows(rows)
+
+    classes = classifier.classes_
+    accuracy = {}
+    for name, proba in (("full", full_proba), ("compact", compact_proba)):
+        y_pred = classes.take(proba.argmax(axis=1))
+        accuracy[name] = {"accuracy": accuracy_score(y_val, y_pred), "macro_f1": f1_score(y_val, y_pred, average='macro')}
+
+    report = {
+        "model_id": manifest["model_id"],
+        "parent_model_id": parent_id,
+        "value_dtype": args.value_dtype,
+        "trees": {"before": forest.n_trees, "after": len(selected), "selected": selected},
+        "pickle": {"size_bytes": os.path.getsize(args.model_path), "load_ms": pickle_load_ms},
+        "full_artifact": full_profile,
+        "compact_artifact": compact_profile,
+        "validation": {
+            "rows": len(rows),
+            **accuracy,
+            "label_agreement": float((full_proba.argmax(axis=1) == compact_proba.argmax(axis=1)).mean()),
+            "max_probability_change": float(np.abs(full_proba - compact_proba).max())
+        }
+    }
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'':24}{'pickle':>12}{'artifact':>12}{'compact':>12}")
+    print(f"{'size (KiB)':24}{report['pickle']['size_bytes'] / 1024:12.0f}"
+          f"{full_profile['size_bytes'] / 1024:12.0f}{compact_profile['size_bytes'] / 1024:12.0f}")
+    print(f"{'forest memory (KiB)':24}{'':>12}"
+          f"{full_profile['forest_bytes'] / 1024:12.0f}{compact_profile['forest_bytes'] / 1024:12.0f}")
+    print(f"{'load (ms)':24}{pickle_load_ms:12.1f}{full_profile['load_ms']:12.1f}{compact_profile['load_ms']:12.1f}")
+    print(f"{'1 row (ms)':24}{'':>12}{full_profile['latency_1_row_ms']:12.3f}{compact_profile['latency_1_row_ms']:12.3f}")
+    print(f"{'1000 rows (ms)':24}{'':>12}"
+          f"{full_profile['latency_1000_rows_ms']:12.2f}{compact_profile['latency_1000_rows_ms']:12.2f}")
+    print(f"{'validation macro F1':24}{'':>12}"
+          f"{accuracy['full']['macro_f1']:12.4f}{accuracy['compact']['macro_f1']:12.4f}")
+    print(f"📦 Compact artifact saved to {args.output}/ (model id {manifest['model_id']})")
+    print(f"📄 Report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Holds the served model and swaps in new ones without restarting the API.
+
+A new model is loaded and warmed up in the background, then published with a
+single reference assignment. Request handlers read `manager.current` once and
+keep using that LoadedModel, so requests already running finish on the old
+model while new ones pick up the new one.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+import csv
+import itertools
+import math
+import os
+import threading
+import time
+
+from predictor import load_engine, model_fingerprint, predict_rows
+
+
+class ReloadInProgressError(RuntimeError):
+    """Raised when a reload is requested while another one is still running"""
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    engine: object
+    model_id: str
+    path: str
+    loaded_at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+
+    def info(self) -> dict:
+        return {
+            "model_version": self.model_id,
+            "model_path": self.path,
+            "backend": self.engine.name,
+            "loaded_at": self.loaded_at
+        }
+
+
+def parse_csv_value(value: str):
+    """Numbers as int or float, as pandas reads them; anything else (including "None") stays a string"""
+    for cast in (int, float):
+        try:
+            number = cast(value)
+        except ValueError:
+            continue
+        if math.isfinite(number):
+            return number
+    return value
+
+
+def read_sample_records(data_path: str, n_rows: int) -> list:
+    """First n_rows records of a CSV keyed by its header, read with the csv module to keep pandas out of serving"""
+    if n_rows <= 0 or not os.path.exists(data_path):
+        return []
+    with open(data_path, newline='') as f:
+        return [
+            {key.strip(): parse_csv_value(value) for key, value in record.items()}
+            for record in itertools.islice(csv.DictReader(f), n_rows)
+        ]
+
+
+def load_warmup_rows(data_path: str, n_rows: int) -> list:
+    """Sample rows from the training CSV, keyed by training column names like API input"""
+    return [
+        {key.lower().replace(' ', '_'): value for key, value in record.items()
+         if key.lower().replace(' ', '_') != 'premium_category'}
+        for record in read_sample_records(data_path, n_rows)
+    ]
+
+
+def model_signature(path: str):
+    """Cheap change detector for the file watcher: mtime and size of the model file or manifest"""
+    target = os.path.join(path, "manifest.json") if os.path.isdir(path) else path
+    try:
+        stat = os.stat(target)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class ModelManager:
+    def __init__(self, path: str, backend: str = None, warmup_data: str = None, warmup_rows: int = 0):
+        self.path = path
+        self.backend = backend
+        self.warmup_data = warmup_data
+        self.warmup_rows = warmup_rows
+        self.current = None
+        self.last_error = None
+        self._reload_lock = threading.Lock()
+        self._watch_thread = None
+        self._stop_watching = threading.Event()
+
+    def _load(self, path: str) -> LoadedModel:
+        model = LoadedModel(engine=load_engine(path, self.backend), model_id=model_fingerprint(path), path=path)
+        # Warm up before publishing so the first real requests don't pay for cold caches
+        rows = load_warmup_rows(self.warmup_data, self.warmup_rows) if self.warmup_data else []
+        if rows:
+            predict_rows(model.engine, rows)
+            predict_rows(model.engine, rows[:1])
+            if hasattr(model.engine, "explain_rows"):
+                model.engine.explain_rows(rows[:1])
+        return model
+
+    def reload(self, path: str = None, force: bool = False) -> LoadedModel:
+        """Load, warm up and atomically swap in the model at path (default: the configured path).
+
+        Raises ReloadInProgressError if another reload is running. On failure the
+        current model keeps serving and the exception propagates.
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            raise ReloadInProgressError("A model reload is already in progress")
+        try:
+            path = path or self.path
+            current = self.current
+            if not force and current is not None and current.path == path and \
+                    model_fingerprint(path) == current.model_id:
+                return current
+
+            start = time.perf_counter()
+            try:
+                model = self._load(path)
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                raise
+            self.current = model
+            self.path = path
+            self.last_error = None
+            print(f"✅ Model loaded successfully! ({path}, backend: {model.engine.name}, "
+                  f"id: {model.model_id}, {(time.perf_counter() - start) * 1000:.0f} ms)")
+            return model
+        finally:
+            self._reload_lock.release()
+
+    def start_watching(self, interval: float):
+        """Poll the model file every interval seconds and reload it when it changes"""
+        if interval <= 0 or self._watch_thread is not None:
+            return
+        self._stop_watching.clear()
+        self._watch_thread = threading.Thread(target=self._watch, args=(interval,), name="model-watcher", daemon=True)
+        self._watch_thread.start()
+
+    def stop_watching(self):
+        self._stop_watching.set()
+        if self._watch_thread is not None:
+            self._watch_thread.join()
+            self._watch_thread = None
+
+    def _watch(self, interval: float):
+        signature = model_signature(self.path)
+        while not self._stop_watching.wait(interval):
+            new_signature = model_signature(self.path)
+            if new_signature is None or new_signature == signature:
+                continue
+            try:
+                self.reload()
+                signature = new_signature
+            except ReloadInProgressError:
+                pass
+            except Exception as e:
+                # Possibly caught mid-write; keep serving the old model and retry on the next poll
+                print(f"⚠️ Model reload from {self.path} failed: {e}")
@@ -0,0 +1,251 @@
+"""Several named models served side by side, for A/B tests and shadow scoring.
+
+The primary model (MODEL_PATH) answers requests unless they are routed to
+another named variant, either explicitly with the X-Model-Variant header or by
+a traffic percentage. A shadow variant scores a copy of the requests the
+primary answered on its own thread within a CPU budget, after the
+primary response has been sent, and its answers are compared with the
+primary's: label agreement and the largest class probability difference are
+recorded per variant.
+
+Each variant has its own ModelManager, so every variant is loaded, warmed up
+and reloaded the same way as the primary model.
+"""
+import random
+import threading
+import time
+
+from instrumentation import MODEL_LATENCY, SHADOW_COMPARISONS, SHADOW_DRIFT, SHADOW_DROPPED
+from model_manager import ModelManager
+from predictor import predict_rows
+
+PRIMARY = "primary"
+
+
+class UnknownVariantError(KeyError):
+    """Raised when a request or reload names a model variant that is not configured"""
+
+
+def parse_assignments(spec: str) -> dict:
+    """"name=value,name=value" settings such as MODEL_VARIANTS, as an ordered dict"""
+    assignments = {}
+    for item in (spec or "").split(","):
+        if not item.strip():
+            continue
+        name, separator, value = item.partition("=")
+        if not separator or not name.strip() or not value.strip():
+            raise ValueError(f"Expected name=value, got '{item.strip()}'")
+        assignments[name.strip()] = value.strip()
+    return assignments
+
+
+class ModelRouter:
+    def __init__(self, primary: ModelManager, variants: dict = None, traffic: dict = None, shadow: str = None):
+        """variants maps names to their ModelManager; traffic maps variant names to the percentage
+        of /predict requests (without an X-Model-Variant header) they answer instead of the primary.
+        """
+        self.managers = {PRIMARY: primary, **(variants or {})}
+        self.traffic = {name: float(percent) for name, percent in (traffic or {}).items()}
+        self.shadow = shadow or None
+        for name in [*self.traffic, *([self.shadow] if self.shadow else [])]:
+            if name == PRIMARY or name not in self.managers:
+                raise ValueError(f"'{name}' is not a configured model variant")
+        if any(percent < 0 for percent in self.traffic.values()) or sum(self.traffic.values()) > 100:
+            raise ValueError("Traffic percentages must be non-negative and add up to at most 100")
+
+    @classmethod
+    def from_settings(cls, primary: ModelManager, variants: str, traffic: str, shadow: str, **manager_options):
+        """Router from the MODEL_VARIANTS ("name=path,..."), MODEL_TRAFFIC_SPLIT ("name=percent,...")
+        and MODEL_SHADOW settings; manager_options are passed to every variant's ModelManager.
+        """
+        managers = {name: ModelManager(path, **manager_options) for name, path in parse_assignments(variants).items()}
+        return cls(primary, managers, parse_assignments(traffic), shadow)
+
+    @property
+    def primary(self) -> ModelManager:
+        return self.managers[PRIMARY]
+
+    def manager(self, name: str) -> ModelManager:
+        try:
+            return self.managers[name]
+        except KeyError:
+            raise UnknownVariantError(f"Unknown model variant '{name}'; configured: {', '.join(self.managers)}")
+
+    def choose(self, requested: str = None) -> str:
+        """Variant that answers a request: the requested one, else one drawn by traffic percentage"""
+        if requested:
+            self.manager(requested)
+            return requested
+        if self.traffic:
+            draw = random.random() * 100
+            for name, percent in self.traffic.items():
+                draw -= percent
+                if draw < 0:
+                    return name
+        return PRIMARY
+
+    def load_variants(self):
+        """Load every variant that is not loaded yet; a variant that fails to load doesn't stop the primary"""
+        for name, manager in self.managers.items():
+            if name == PRIMARY or manager.current is not None:
+                continue
+            try:
+                manager.reload()
+            except Exception as e:
+                print(f"⚠️ Model variant '{name}' could not be loaded from {manager.path}: {e}")
+
+    def start_watching(self, interval: float):
+        for manager in self.managers.values():
+            manager.start_watching(interval)
+
+    def stop_watching(self):
+        for manager in self.managers.values():
+            manager.stop_watching()
+
+    def info(self) -> dict:
+        """Every variant's model, traffic share and scoring latency"""
+        traffic = {PRIMARY: 100 - sum(self.traffic.values()), **self.traffic}
+        variants = {}
+        for name, manager in self.managers.items():
+            model = manager.current
+            count, total = MODEL_LATENCY.totals(name)
+            variants[name] = {
+                **(model.info() if model is not None else {"model_path": manager.path}),
+                "loaded": model is not None,
+                "last_reload_error": manager.last_error,
+                "traffic_percent": traffic.get(name, 0.0),
+                "shadow": name == self.shadow,
+                "model_calls": int(count),
+                "mean_scoring_ms": total / count * 1000 if count else None
+            }
+        return variants
+
+
+def probability_drift(primary: dict, shadow: dict) -> float:
+    """Largest difference between the two predictions' probability of any class"""
+    classes = primary.keys() | shadow.keys()
+    return max(abs(primary.get(cls, 0.0) - shadow.get(cls, 0.0)) for cls in classes)
+
+
+class ShadowScorer:
+    """Scores mirrored requests with a shadow model on one background thread, within a CPU budget.
+
+    submit() only records the request. The thread scores what has been
+    recorded in batches, like the micro-batcher does for the primary, and
+    after each batch sleeps long enough to keep its CPU time within cpu_budget
+    (a fraction of one core), so under sustained traffic the shadow keeps
+    scoring at a bounded cost to the primary. The thread isn't given a lower
+    OS scheduling priority: descheduled while holding the GIL, it would stall
+    the serving threads instead.
+
+    At most max_pending requests wait between batches. They are a reservoir
+    sample of every request mirrored since the last batch, so when the shadow
+    can't keep up it compares a uniform sample of the traffic rather than the
+    first requests of each burst; requests that don't make it into the sample
+    are counted as dropped.
+    """
+
+    def __init__(self, variant: str, manager: ModelManager, max_pending: int = 64, sample_rate: float = 1.0,
+                 max_batch_size: int = 64, cpu_budget: float = 0.25):
+        if not 0 < cpu_budget <= 1:
+            raise ValueError("The shadow CPU budget must be a fraction of one core, greater than 0 and at most 1")
+        self.variant = variant
+        self.manager = manager
+        self.max_pending = max_pending
+        self.sample_rate = sample_rate
+        self.max_batch_size = max_batch_size
+        self.cpu_budget = cpu_budget
+        self._pending = []  # reservoir sample of (row, primary prediction) since the last batch
+        self._offered = 0  # requests mirrored since the last batch
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def _ensure_running(self):
+        """Start the scoring thread on first use, so a pre-forking parent never starts one"""
+        if self._thread is None:
+            with self._condition:
+                if self._thread is None:
+                    self._closed = False
+                    self._thread = threading.Thread(target=self._run, name="shadow-scorer", daemon=True)
+                    self._thread.start()
+
+    def submit(self, row: dict, primary_prediction: dict) -> bool:
+        """Offer row for shadow scoring and comparison with the primary's prediction; False if not kept"""
+        if self.manager.current is None or (self.sample_rate < 1.0 and random.random() >= self.sample_rate):
+            return False
+        self._ensure_running()
+        with self._condition:
+            self._offered += 1
+            if len(self._pending) < self.max_pending:
+                self._pending.append((row, primary_prediction))
+                self._condition.notify()
+                return True
+            # Reservoir sampling: every request since the last batch is kept with the same probability
+            SHADOW_DROPPED.inc(self.variant)
+            slot = random.randrange(self._offered)
+            if slot < self.max_pending:
+                self._pending[slot] = (row, primary_prediction)
+                return True
+            return False
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                sample, self._pending, self._offered = self._pending, [], 0
+            for start in range(0, len(sample), self.max_batch_size):
+                cpu_start = time.thread_time()
+                self._compare(sample[start:start + self.max_batch_size])
+                # Idle for long enough that scoring uses at most cpu_budget of a core (close() wakes it up)
+                idle_seconds = (time.thread_time() - cpu_start) * (1 - self.cpu_budget) / self.cpu_budget
+                with self._condition:
+                    if self._condition.wait_for(lambda: self._closed, timeout=idle_seconds):
+                        return
+
+    def _compare(self, batch: list):
+        model = self.manager.current
+        start = time.perf_counter()
+        try:
+            shadow_predictions = predict_rows(model.engine, [row for row, _ in batch]).rows()
+        except Exception as e:
+            SHADOW_COMPARISONS.inc(self.variant, "error", amount=len(batch))
+            print(f"⚠️ Shadow model '{self.variant}' failed to score {len(batch)} rows: {e}")
+            return
+        MODEL_LATENCY.observe(time.perf_counter() - start, self.variant)
+        for (_, primary_prediction), shadow_prediction in zip(batch, shadow_predictions):
+            agrees = shadow_prediction["premium_category"] == primary_prediction["premium_category"]
+            SHADOW_COMPARISONS.inc(self.variant, "agree" if agrees else "disagree")
+            SHADOW_DRIFT.observe(
+                probability_drift(primary_prediction["probabilities"], shadow_prediction["probabilities"]), self.variant
+            )
+
+    def stats(self) -> dict:
+        """Comparisons made so far: agreement rate, mean probability drift, failed and dropped requests"""
+        agreed = SHADOW_COMPARISONS.value(self.variant, "agree")
+        compared = agreed + SHADOW_COMPARISONS.value(self.variant, "disagree")
+        _, drift_total = SHADOW_DRIFT.totals(self.variant)
+        return {
+            "variant": self.variant,
+            "sample_rate": self.sample_rate,
+            "cpu_budget": self.cpu_budget,
+            "compared": int(compared),
+            "agreement_rate": agreed / compared if compared else None,
+            "mean_probability_drift": drift_total / compared if compared else None,
+            "errors": int(SHADOW_COMPARISONS.value(self.variant, "error")),
+            "dropped": int(SHADOW_DROPPED.value(self.variant))
+        }
+
+    def close(self):
+        """Stop the scoring thread once it has finished the batch it is on; pending rows are discarded"""
+        if self._thread is None:
+            return
+        with self._condition:
+            self._closed = True
+            self._pending, self._offered = [], 0
+            self._condition.notify()
+        self._thread.join()
+        self._thread = None
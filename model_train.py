@@ -1,19 +1,43 @@
+import sys
 import pandas as pd
 import numpy as np
 import pickle
 
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import OneHotEncoder, StandardScaler
-from sklearn.pipeline import Pipeline
-from sklearn.compose import ColumnTransformer
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix, f1_score
 
 from imblearn.over_sampling import SMOTE
 from imblearn.pipeline import Pipeline as ImbPipeline
 
+from feature_schema import CSV_OPTIONS, TARGET, build_preprocessor, normalize_columns
+from model_artifact import data_fingerprint, save_artifact
+
+# `python model_train.py search ...` runs the cross-validated hyperparameter search instead,
+# `python model_train.py update ...` incrementally updates the last model with appended rows,
+# `python model_train.py compress ...` writes a pruned, quantized artifact for low-memory serving,
+# `python model_train.py fast ...` trains this model with every core and reports stage timings
+if len(sys.argv) > 1 and sys.argv[1] == "search":
+    from model_search import main
+    main(sys.argv[2:])
+    sys.exit(0)
+if len(sys.argv) > 1 and sys.argv[1] == "update":
+    from model_update import main
+    main(sys.argv[2:])
+    sys.exit(0)
+if len(sys.argv) > 1 and sys.argv[1] == "compress":
+    from model_compress import main
+    main(sys.argv[2:])
+    sys.exit(0)
+if len(sys.argv) > 1 and sys.argv[1] == "fast":
+    from model_train_fast import main
+    main(sys.argv[2:])
+    sys.exit(0)
+
 # Load dataset
-df = pd.read_csv('insurance_premium_dataset.csv')
+data_path = 'insurance_premium_dataset.csv'
+# "None" stays a category, as the API sends it
+df = pd.read_csv(data_path, **CSV_OPTIONS)
 import pandas as pd
 
 # Assuming df is your DataFrame
@@ -22,24 +46,18 @@ for column in df.columns:
     print(f"Unique values in '{column}': {unique_values}\n")
 
 # Rename columns for consistency
-df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_')
+df = normalize_columns(df)
 
 # Target column
-target = 'premium_category'
+target = TARGET
 
 # Separate features and target
 X = df.drop(columns=[target])
 y = df[target]
 
-# Identify feature types
-categorical = X.select_dtypes(include=['object']).columns.tolist()
-numerical = X.select_dtypes(include=['int64', 'float64']).columns.tolist()
-
-# Preprocessor
-preprocessor = ColumnTransformer([
-    ('num', StandardScaler(), numerical),
-    ('cat', OneHotEncoder(handle_unknown='ignore'), categorical)
-])
+# Preprocessor: feature types and category vocabularies come from the shared feature schema;
+# categorical columns are encoded to integer codes and the codes one-hot encoded
+preprocessor = build_preprocessor()
 
 # Define pipeline with SMOTE
 pipeline = ImbPipeline([
@@ -75,7 +93,17 @@ with open(model_path, 'wb') as f:
 accuracy = accuracy_score(y_test, y_pred)
 macro_f1 = f1_score(y_test, y_pred, average='macro')
 
+# Save memory-mappable model artifact for serving
+artifact_path = 'insurance_model'
+manifest = save_artifact(
+    pipeline,
+    artifact_path,
+    training_data=data_fingerprint(data_path, rows=len(df)),
+    metrics={"accuracy": accuracy, "macro_f1": macro_f1}
+)
+
 print(f"✅ Model saved to {model_path}")
+print(f"📦 Model artifact saved to {artifact_path}/ (model id {manifest['model_id']})")
 print(f"🎯 Accuracy: {accuracy:.2f}")
 print(f"🔁 Macro F1 Score: {macro_f1:.2f}")
 print("📊 Classification Report:")
@@ -0,0 +1,212 @@
+"""Training performance mode: the model_train.py model, trained with every core.
+
+model_train.py fits the ImbPipeline as a whole: preprocessing output that is
+part sparse, SMOTE's nearest-neighbour search on a single thread, and a forest
+fitted on one core. This mode runs the same stages by hand:
+
+- The training split is encoded once into a dense float32 matrix, the dtype
+  the forest's trees work in, so nothing downstream converts or copies it.
+- SMOTE's k-nearest-neighbour search runs on all cores (a NearestNeighbors
+  with n_jobs), and the forest is fitted with n_jobs as well.
+- Every stage is timed; timings are printed and written to --timings.
+
+Results don't depend on the number of cores: SMOTE and the forest draw all
+their randomness from the fixed seed, and neighbour search and tree fitting
+give the same result however the work is split. Two runs with the same seed
+and data give bit-for-bit identical forests (compare the printed forest
+digest, or pass --verify-reproducible to refit on a single core and check).
+The model is not bit-identical to model_train.py's, since SMOTE interpolates
+in float32 here.
+
+--replicate N trains on N copies of the training split with a little noise on
+the numeric features, to see how training time scales with data size and
+cores (use --no-save to keep the current model).
+
+Usage:
+    python model_train.py fast --n-jobs -1 --timings train_timings.json
+    python model_train.py fast --replicate 50 --no-save --verify-reproducible
+"""
+import argparse
+from contextlib import contextmanager
+import hashlib
+import json
+import os
+import pickle
+import time
+import numpy as np
+
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.model_selection import train_test_split
+from sklearn.neighbors import NearestNeighbors
+
+from imblearn.over_sampling import SMOTE
+from imblearn.pipeline import Pipeline as ImbPipeline
+
+from feature_schema import NUMERIC_COLUMNS, RANDOM_STATE, TARGET, build_preprocessor, read_training_csv
+from model_artifact import data_fingerprint, save_artifact
+
+# The forest and SMOTE settings of model_train.py
+FOREST_PARAMS = {
+    "n_estimators": 300,
+    "max_depth": 20,
+    "min_samples_split": 3,
+    "min_samples_leaf": 2,
+    "class_weight": "balanced_subsample"
+}
+SMOTE_K_NEIGHBORS = 5
+
+
+class StageTimer:
+    """Wall-clock seconds of each named training stage, printed as they finish"""
+
+    def __init__(self):
+        self.seconds = {}
+
+    @contextmanager
+    def __call__(self, name: str):
+        start = time.perf_counter()
+        yield
+        self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - start
+        print(f"⏱️ {name:<10} {self.seconds[name]:8.2f} s")
+
+
+def encode(preprocessor, X) -> np.ndarray:
+    """Preprocessor output as a dense, C-contiguous float32 matrix"""
+    X_encoded = preprocessor.transform(X)
+    if hasattr(X_encoded, "toarray"):
+        X_encoded = X_encoded.toarray()
+    return np.ascontiguousarray(X_encoded, dtype=np.float32)
+
+
+def replicate(X: np.ndarray, y: np.ndarray, copies: int, noise: float = 0.01):
+    """copies x the rows, with Gaussian noise (in standard deviations) on the scaled numeric columns.
+
+    The preprocessor puts the numeric columns first. The noise comes from a
+    seeded generator, so replicated data is the same on every run.
+    """
+    if copies <= 1:
+        return X, y
+    rng = np.random.default_rng(RANDOM_STATE)
+    X_copies = np.tile(X, (copies, 1))
+    n_numeric = len(NUMERIC_COLUMNS)
+    X_copies[len(X):, :n_numeric] += rng.normal(0, noise, size=(len(X) * (copies - 1), n_numeric)).astype(np.float32)
+    return X_copies, np.tile(y, copies)
+
+
+def resample(X: np.ndarray, y: np.ndarray, n_jobs: int):
+    """SMOTE with the neighbour search spread over n_jobs cores"""
+    neighbours = NearestNeighbors(n_neighbors=SMOTE_K_NEIGHBORS + 1, n_jobs=n_jobs)
+    return SMOTE(random_state=RANDOM_STATE, k_neighbors=neighbours).fit_resample(X, y)
+
+
+def fit_forest(X: np.ndarray, y: np.ndarray, n_jobs: int) -> RandomForestClassifier:
+    forest = RandomForestClassifier(random_state=RANDOM_STATE, n_jobs=n_jobs, **FOREST_PARAMS)
+    forest.fit(X, y)
+    # The saved model predicts single-threaded, like every other model the API serves
+    forest.set_params(n_jobs=None)
+    return forest
+
+
+def forest_digest(forest) -> str:
+    """SHA-256 of every tree's structure, thresholds and leaf values, to compare fits"""
+    digest = hashlib.sha256()
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        for array in (tree.children_left, tree.children_right, tree.feature, tree.threshold, tree.value):
+            digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the premium model using every core, with stage timings")
+    parser.add_argument("--data", default="insurance_premium_dataset.csv")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Cores for SMOTE's neighbour search and the forest")
+    parser.add_argument("--replicate", type=int, default=1,
+                        help="Train on this many noisy copies of the training split (scaling tests)")
+    parser.add_argument("--model-path", default="insurance_model.pkl")
+    parser.add_argument("--artifact-path", default="insurance_model")
+    parser.add_argument("--no-save", action="store_true", help="Don't write the model (e.g. for scaling tests)")
+    parser.add_argument("--verify-reproducible", action="store_true",
+                        help="Refit SMOTE and the forest on one core and check the forest is bit-for-bit the same")
+    parser.add_argument("--timings", default="train_timings.json", help="JSON report of the stage timings")
+    args = parser.parse_args(argv)
+
+    timer = StageTimer()
+    with timer("read"):
+        df = read_training_csv(args.data)
+        X, y = df.drop(columns=[TARGET]), df[TARGET]
+        # Same held-out split as model_train.py
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=0.2, stratify=y, random_state=RANDOM_STATE
+        )
+
+    with timer("encode"):
+        preprocessor = build_preprocessor().fit(X_train)
+        X_encoded, y_encoded = replicate(encode(preprocessor, X_train), y_train.to_numpy(), args.replicate)
+    print(f"🧮 {X_encoded.shape[0]} x {X_encoded.shape[1]} float32 training matrix "
+          f"({X_encoded.nbytes / 2**20:.1f} MiB)")
+
+    with timer("smote"):
+        X_resampled, y_resampled = resample(X_encoded, y_encoded, args.n_jobs)
+
+    with timer("fit"):
+        forest = fit_forest(X_resampled, y_resampled, args.n_jobs)
+    digest = forest_digest(forest)
+    print(f"🌲 {len(forest.estimators_)} trees on {len(X_resampled)} rows, forest digest {digest[:16]}")
+
+    with timer("evaluate"):
+        y_pred = forest.predict(encode(preprocessor, X_test))
+        accuracy = accuracy_score(y_test, y_pred)
+        macro_f1 = f1_score(y_test, y_pred, average='macro')
+    print(f"🎯 Accuracy: {accuracy:.2f}")
+    print(f"🔁 Macro F1 Score: {macro_f1:.2f}")
+
+    reproducible = None
+    if args.verify_reproducible:
+        with timer("verify"):
+            X_again, y_again = resample(X_encoded, y_encoded, n_jobs=1)
+            reproducible = forest_digest(fit_forest(X_again, y_again, n_jobs=1)) == digest
+        if reproducible:
+            print("✅ Single-core refit matches the forest bit for bit")
+
+    if not args.no_save:
+        with timer("save"):
+            pipeline = ImbPipeline([
+                ('preprocessor', preprocessor),
+                ('smote', SMOTE(random_state=RANDOM_STATE, k_neighbors=SMOTE_K_NEIGHBORS)),
+                ('classifier', forest)
+            ])
+            with open(args.model_path, 'wb') as f:
+                pickle.dump(pipeline, f)
+            manifest = save_artifact(
+                pipeline,
+                args.artifact_path,
+                training_data=data_fingerprint(args.data, rows=len(df)),
+                metrics={"accuracy": accuracy, "macro_f1": macro_f1}
+            )
+        print(f"✅ Model saved to {args.model_path}")
+        print(f"📦 Model artifact saved to {args.artifact_path}/ (model id {manifest['model_id']})")
+
+    report = {
+        "n_jobs": args.n_jobs,
+        "cpu_count": os.cpu_count(),
+        "replicate": args.replicate,
+        "training_rows": int(X_encoded.shape[0]),
+        "resampled_rows": int(X_resampled.shape[0]),
+        "features": int(X_encoded.shape[1]),
+        "stage_seconds": timer.seconds,
+        "total_seconds": sum(timer.seconds.values()),
+        "forest_digest": digest,
+        "reproducible": reproducible,
+        "metrics": {"accuracy": accuracy, "macro_f1": macro_f1}
+    }
+    with open(args.timings, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"⏱️ Total {report['total_seconds']:.1f} s; timings written to {args.timings}")
+    if reproducible is False:
+        raise SystemExit("❌ Single-core refit does not match the forest; training is not reproducible")
+
+
+if __name__ == "__main__":
+    main()
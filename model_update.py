@@ -0,0 +1,225 @@
+"""Incremental retraining from rows appended to the training CSV.
+
+The artifact manifest records the size and hash of the data the model was
+trained on. If the CSV still starts with exactly those bytes, everything after
+them is new, and only that tail is read:
+
+- Running mean/variance of the numeric columns are updated with partial_fit
+  and stored with the data fingerprint; the report shows how far the new rows
+  drifted. The fitted scaler and one-hot categories themselves stay fixed:
+  trees only compare against thresholds in the scaled space, so keeping it
+  fixed is what lets the existing trees stay valid unchanged (new categories
+  are encoded as unknown and listed in the report).
+- SMOTE resamples the new rows only, and warm_start adds trees fitted on them
+  to the forest, optionally dropping the oldest trees first.
+- The updated model is saved as a new artifact (recording the previous model
+  id and the new data fingerprint), and a report compares both models on a
+  held-out part of the new rows.
+
+Usage:
+    python model_train.py update --add-trees 50 --replace-trees 50
+    python model_update.py --data insurance_premium_dataset.csv --report update_report.json
+"""
+import argparse
+import io
+import json
+import pickle
+import time
+import numpy as np
+import pandas as pd
+
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from feature_schema import CATEGORIES, CSV_OPTIONS, RANDOM_STATE, TARGET, normalize_columns
+from model_artifact import data_fingerprint, file_sha256, read_manifest, save_artifact
+
+
+def read_appended_rows(data_path: str, training_data: dict) -> pd.DataFrame:
+    """Rows added to data_path after the bytes described by training_data, or an error if it changed otherwise"""
+    if file_sha256(data_path, training_data["bytes"]) != training_data["sha256"]:
+        raise SystemExit(f"❌ {data_path} no longer starts with the data the model was trained on; "
+                         f"run a full training instead")
+    with open(data_path, 'rb') as f:
+        header = f.readline()
+        f.seek(training_data["bytes"])
+        tail = f.read()
+    if not tail.strip():
+        return pd.DataFrame()
+    return normalize_columns(pd.read_csv(io.BytesIO(header + tail), **CSV_OPTIONS))
+
+
+def find_transformer(preprocessor, kind):
+    for _, transformer, columns in preprocessor.transformers_:
+        if isinstance(transformer, kind):
+            return transformer, list(columns)
+    return None, []
+
+
+def update_feature_stats(preprocessor, training_data: dict, X_new: pd.DataFrame):
+    """Running mean/variance of the numeric columns over all rows seen so far, and the drift of the new rows.
+
+    Starts from the statistics stored with the previous model (or the fitted
+    scaler's) and folds in the new rows with StandardScaler.partial_fit. Drift
+    is the new rows' mean shift in units of the scaler's standard deviation.
+    """
+    scaler, columns = find_transformer(preprocessor, StandardScaler)
+    if scaler is None:
+        return None, {}
+    stats = training_data.get("numeric_stats") or {
+        "n": int(scaler.n_samples_seen_), "mean": scaler.mean_.tolist(), "var": scaler.var_.tolist()
+    }
+    running = StandardScaler()
+    running.n_samples_seen_ = stats["n"]
+    running.mean_ = np.asarray(stats["mean"], dtype=np.float64)
+    running.var_ = np.asarray(stats["var"], dtype=np.float64)
+    running.partial_fit(X_new[columns].to_numpy(dtype=np.float64))
+
+    drift = (X_new[columns].mean().to_numpy() - scaler.mean_) / scaler.scale_
+    return (
+        {"n": int(running.n_samples_seen_), "mean": running.mean_.tolist(), "var": running.var_.tolist()},
+        {column: float(value) for column, value in zip(columns, drift)}
+    )
+
+
+def unseen_categories(X_new: pd.DataFrame) -> dict:
+    """Values of each categorical column that are not in its feature schema vocabulary"""
+    unseen = {}
+    for column, categories in CATEGORIES.items():
+        new = sorted(str(value) for value in X_new[column].dropna().unique() if value not in categories)
+        if new:
+            unseen[column] = new
+    return unseen
+
+
+def resample(smote, X, y):
+    """SMOTE the new rows, with fewer neighbours if a class has too few rows for the trained setting"""
+    smallest_class = int(pd.Series(y).value_counts().min())
+    if smallest_class < 2:
+        print("⚠️ A class has a single new row; skipping SMOTE for this update")
+        return X, y
+    smote = clone(smote)
+    if isinstance(smote.k_neighbors, int) and smote.k_neighbors >= smallest_class:
+        smote.set_params(k_neighbors=smallest_class - 1)
+    return smote.fit_resample(X, y)
+
+
+def evaluate(pipeline, X: pd.DataFrame, y: pd.Series) -> dict:
+    if len(X) == 0:
+        return {}
+    y_pred = pipeline.predict(X)
+    return {"accuracy": accuracy_score(y, y_pred), "macro_f1": f1_score(y, y_pred, average='macro')}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incrementally update the premium model with appended rows")
+    parser.add_argument("--data", default="insurance_premium_dataset.csv")
+    parser.add_argument("--model-path", default="insurance_model.pkl", help="Pickled pipeline to update in place")
+    parser.add_argument("--artifact-path", default="insurance_model",
+                        help="Artifact of the current model (read for its data fingerprint, then replaced)")
+    parser.add_argument("--add-trees", type=int, default=50, help="Trees to fit on the new rows")
+    parser.add_argument("--replace-trees", type=int, default=0, help="Oldest trees to drop before adding new ones")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Share of new rows held out for the comparison")
+    parser.add_argument("--report", default="update_report.json")
+    args = parser.parse_args(argv)
+
+    manifest = read_manifest(args.artifact_path)
+    training_data = manifest.get("training_data")
+    if not training_data:
+        raise SystemExit(f"❌ {args.artifact_path} has no training data fingerprint; run a full training first")
+
+    start = time.perf_counter()
+    df_new = read_appended_rows(args.data, training_data)
+    if df_new.empty:
+        print(f"✅ No new rows since model {manifest['model_id']}; nothing to do")
+        return
+    X_new, y_new = df_new.drop(columns=[TARGET]), df_new[TARGET]
+    read_seconds = time.perf_counter() - start
+
+    with open(args.model_path, 'rb') as f:
+        pipeline = pickle.load(f)
+    preprocessor = pipeline.named_steps['preprocessor']
+    smote = pipeline.named_steps['smote']
+    classifier = pipeline.named_steps['classifier']
+
+    missing = set(classifier.classes_) - set(y_new)
+    if missing:
+        raise SystemExit(f"❌ New rows contain no {sorted(missing)} examples; new trees need every class")
+
+    # Hold out part of the new rows to compare the previous and updated model on unseen data
+    X_fit, X_holdout, y_fit, y_holdout = X_new, X_new.iloc[:0], y_new, y_new.iloc[:0]
+    if args.holdout > 0 and len(X_new) * args.holdout >= len(classifier.classes_):
+        X_fit, X_holdout, y_fit, y_holdout = train_test_split(
+            X_new, y_new, test_size=args.holdout, stratify=y_new, random_state=RANDOM_STATE
+        )
+    previous_metrics = evaluate(pipeline, X_holdout, y_holdout)
+
+    start = time.perf_counter()
+    numeric_stats, drift = update_feature_stats(preprocessor, training_data, X_fit)
+    new_categories = unseen_categories(X_fit)
+    X_encoded = preprocessor.transform(X_fit)
+    X_resampled, y_resampled = resample(smote, X_encoded, y_fit)
+    n_before = len(classifier.estimators_)
+    if args.replace_trees:
+        classifier.estimators_ = classifier.estimators_[args.replace_trees:]
+    classifier.set_params(warm_start=True, n_estimators=len(classifier.estimators_) + args.add_trees)
+    classifier.fit(X_resampled, y_resampled)
+    classifier.set_params(warm_start=False)
+    fit_seconds = time.perf_counter() - start
+
+    updated_metrics = evaluate(pipeline, X_holdout, y_holdout)
+
+    with open(args.model_path, 'wb') as f:
+        pickle.dump(pipeline, f)
+    new_manifest = save_artifact(
+        pipeline,
+        args.artifact_path,
+        training_data={
+            **data_fingerprint(args.data, rows=training_data["rows"] + len(df_new)),
+            "numeric_stats": numeric_stats
+        },
+        metrics={f"holdout_{name}": value for name, value in updated_metrics.items()},
+        parent_model_id=manifest["model_id"]
+    )
+
+    report = {
+        "previous_model_id": manifest["model_id"],
+        "model_id": new_manifest["model_id"],
+        "new_rows": len(df_new),
+        "fit_rows": len(X_fit),
+        "holdout_rows": len(X_holdout),
+        "trees": {"before": n_before, "removed": min(args.replace_trees, n_before),
+                  "added": args.add_trees, "after": len(classifier.estimators_)},
+        "read_seconds": read_seconds,
+        "fit_seconds": fit_seconds,
+        "metrics": {
+            "previous_training": manifest.get("metrics", {}),
+            "previous_holdout": previous_metrics,
+            "updated_holdout": updated_metrics
+        },
+        "numeric_drift": drift,
+        "unseen_categories": new_categories
+    }
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"🆕 {len(df_new)} new rows since model {manifest['model_id']} ({len(X_holdout)} held out)")
+    print(f"🌲 Trees: {n_before} - {report['trees']['removed']} + {args.add_trees} = {len(classifier.estimators_)} "
+          f"(fit in {fit_seconds:.1f} s)")
+    for name in updated_metrics:
+        print(f"📊 Holdout {name}: {previous_metrics[name]:.3f} -> {updated_metrics[name]:.3f}")
+    drifted = {column: round(value, 2) for column, value in drift.items() if abs(value) > 0.5}
+    if drifted:
+        print(f"⚠️ New rows drifted by more than 0.5 std: {drifted}")
+    if new_categories:
+        print(f"⚠️ Categories outside the feature schema are encoded as unknown: {new_categories}; "
+              f"add them to feature_schema.py and run a full training to learn them")
+    print(f"✅ Model saved to {args.model_path}")
+    print(f"📦 Model artifact saved to {args.artifact_path}/ (model id {new_manifest['model_id']})")
+    print(f"📄 Report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""Flattened, array-backed random forest evaluator.
+
+All trees of a fitted forest are packed into contiguous NumPy arrays (feature,
+threshold, children, leaf value), with child pointers rewritten to global
+node indices. Evaluation walks every tree for a batch of rows together, one
+level per step, so the cost is a handful of vectorized operations per level
+instead of sklearn's per-estimator Python loop.
+
+The level-by-level walk pays numpy's per-call overhead on every level for
+every (tree, row) pair, which wins for small batches but loses to compiled
+per-row traversal on large ones. Batches of compiled_min_rows rows or more are
+therefore walked by sklearn's Cython Tree.apply on trees rebuilt from the same
+node arrays (sklearn is imported and the trees are built on the first such
+batch); the leaf probabilities are taken from the packed arrays either way, so
+both walks return identical results.
+
+The same walk also yields tree-path feature attributions: every split a row
+passes through credits the change in class probabilities between the node and
+the child it moves to to the split feature. Averaged over the trees, the
+contributions plus the forest's root probabilities add up exactly to
+predict_proba.
+"""
+import numpy as np
+
+from fast_engine import FastPathEngine, UnsupportedPipelineError
+
+
+def _index_array(array) -> np.ndarray:
+    array = np.asarray(array)
+    return array if array.dtype.kind in 'iu' else array.astype(np.intp)
+
+
+class PackedForest:
+    """A forest's node arrays laid out back to back, one tree after another"""
+
+    # Rows are scored in chunks so the (n_trees, n_rows) node matrix stays small
+    chunk_size = 4096
+    # Batches at least this large are walked by sklearn's compiled trees (see compiled_trees)
+    compiled_min_rows = 128
+
+    def __init__(self, feature, threshold, children, value, roots, max_depth):
+        """children interleaves child pointers: node n's left/right child sit at 2n and 2n + 1.
+
+        Index arrays are used in whatever integer type they come in (intp for
+        full models, so take() never has to convert them, or int16/int32 for
+        compact ones), which lets memory-mapped arrays be used as-is without a
+        private copy.
+        """
+        self.feature = _index_array(feature)
+        self.threshold = np.asarray(threshold)
+        self.children = _index_array(children)
+        self.value = np.asarray(value)
+        self.roots = _index_array(roots)
+        self.max_depth = int(max_depth)
+        # sklearn trees for large batches: None until first needed, False if they can't be built
+        self._compiled = None
+
+    @property
+    def left(self) -> np.ndarray:
+        return self.children[0::2]
+
+    @property
+    def right(self) -> np.ndarray:
+        return self.children[1::2]
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    @classmethod
+    def from_forest(cls, forest):
+        """Pack a fitted RandomForestClassifier (or any forest of sklearn trees)"""
+        estimators = getattr(forest, 'estimators_', None)
+        if not estimators or not all(hasattr(tree, 'tree_') for tree in estimators):
+            raise UnsupportedPipelineError("Classifier is not a fitted forest of decision trees")
+        if getattr(forest, 'n_outputs_', 1) != 1:
+            raise UnsupportedPipelineError("Multi-output forests are not supported")
+
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            n = tree.node_count
+            is_leaf = tree.children_left == -1
+            own_index = np.arange(offset, offset + n)
+
+            # Leaves point to themselves, so extra walking steps keep rows in place
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+            left = np.where(is_leaf, own_index, tree.children_left + offset)
+            right = np.where(is_leaf, own_index, tree.children_right + offset)
+            children.append(np.stack([left, right], axis=1).ravel())
+
+            # Per-node class probabilities, normalized the same way as DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :].astype(np.float64)
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(value / normalizer)
+
+            roots.append(offset)
+            offset += n
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            children=np.concatenate(children).astype(np.intp),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth
+        )
+
+    def compact(self, value_dtype=np.float16) -> "PackedForest":
+        """Copy with narrow storage: int16 features, int32 node indices, float32 thresholds and
+        leaf probabilities in value_dtype. Only the leaf probabilities lose precision.
+        """
+        if self.n_nodes * 2 + 1 > np.iinfo(np.int32).max or self.feature.max() > np.iinfo(np.int16).max:
+            raise ValueError("Forest is too large for compact index types")
+        # Features are compared as float32, so rounding each threshold down to float32 keeps
+        # every comparison x > threshold exactly as it was
+        threshold = self.threshold.astype(np.float32)
+        rounded_up = threshold.astype(np.float64) > self.threshold
+        threshold[rounded_up] = np.nextafter(threshold[rounded_up], np.float32(-np.inf))
+        return PackedForest(
+            feature=self.feature.astype(np.int16),
+            threshold=threshold,
+            children=self.children.astype(np.int32),
+            value=self.value.astype(value_dtype),
+            roots=self.roots.astype(np.int32),
+            max_depth=self.max_depth
+        )
+
+    def compiled_trees(self) -> list:
+        """sklearn Tree objects with this forest's splits, or None if sklearn can't build them.
+
+        Only the node structure is copied; leaf probabilities stay in self.value.
+        Built on first use and kept (two threads racing here just build it twice).
+        """
+        if self._compiled is None:
+            try:
+                self._compiled = self._build_compiled_trees()
+            except (ImportError, ValueError, TypeError) as e:
+                print(f"⚠️ Compiled tree walk unavailable ({e}); large batches use the packed walk")
+                self._compiled = False
+        return self._compiled or None
+
+    def _build_compiled_trees(self) -> list:
+        from sklearn.tree._tree import NODE_DTYPE, TREE_LEAF, TREE_UNDEFINED, Tree
+
+        n_classes = np.array([self.value.shape[1]], dtype=np.intp)
+        n_features = int(self.feature.max()) + 1
+        ends = np.append(self.roots[1:], self.n_nodes)
+        trees = []
+        for start, end in zip(self.roots.tolist(), ends.tolist()):
+            left = self.left[start:end].astype(np.intp)
+            right = self.right[start:end].astype(np.intp)
+            is_leaf = left == np.arange(start, end)
+            nodes = np.zeros(end - start, dtype=NODE_DTYPE)
+            nodes['left_child'] = np.where(is_leaf, TREE_LEAF, left - start)
+            nodes['right_child'] = np.where(is_leaf, TREE_LEAF, right - start)
+            nodes['feature'] = np.where(is_leaf, TREE_UNDEFINED, self.feature[start:end])
+            nodes['threshold'] = np.where(is_leaf, TREE_UNDEFINED, self.threshold[start:end])
+            tree = Tree(n_features, n_classes, 1)
+            tree.__setstate__({
+                "max_depth": self.max_depth,
+                "node_count": end - start,
+                "nodes": nodes,
+                "values": np.zeros((end - start, 1, n_classes[0]))
+            })
+            trees.append(tree)
+        return trees
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """Global leaf index reached in every tree, shape (n_trees, n_rows)"""
+        # sklearn trees compare float32 features against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        trees = self.compiled_trees() if len(X) >= self.compiled_min_rows else None
+        if trees is not None:
+            return np.stack([tree.apply(X) for tree in trees]) + self.roots[:, np.newaxis]
+
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+
+        # One walker per (tree, row) pair, tree-major
+        nodes = np.repeat(self.roots, n_rows)
+        row_offsets = np.tile(np.arange(n_rows, dtype=np.intp) * n_features, self.n_trees)
+        for _ in range(self.max_depth):
+            go_right = flat_X.take(row_offsets + self.feature.take(nodes)) > self.threshold.take(nodes)
+            nodes = self.children.take(2 * nodes + go_right)
+        return nodes.reshape(self.n_trees, n_rows)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Average of per-tree leaf probabilities, matching RandomForestClassifier.predict_proba"""
+        X = np.asarray(X)
+        trees = self.compiled_trees() if len(X) >= self.compiled_min_rows else None
+        if trees is not None:
+            # One tree at a time, so memory stays O(n_rows) without chunking
+            X = np.ascontiguousarray(X, dtype=np.float32)
+            total = np.zeros((len(X), self.value.shape[1]))
+            for tree, root in zip(trees, self.roots.tolist()):
+                total += self.value.take(tree.apply(X) + root, axis=0)
+            return total / self.n_trees
+        if len(X) > self.chunk_size:
+            return np.concatenate([
+                self.predict_proba(X[start:start + self.chunk_size])
+                for start in range(0, len(X), self.chunk_size)
+            ])
+        leaves = self.apply(X)
+        return self.value.take(leaves, axis=0).sum(axis=0, dtype=np.float64) / self.n_trees
+
+    def contributions(self, X: np.ndarray):
+        """Tree-path attributions: (bias, contributions) with bias of shape (n_classes,) and
+        contributions of shape (n_rows, n_features, n_classes), so that
+        bias + contributions.sum(axis=1) == predict_proba(X)
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        n_classes = self.value.shape[1]
+        flat_X = X.ravel()
+
+        nodes = np.repeat(self.roots, n_rows)
+        row_offsets = np.tile(np.arange(n_rows, dtype=np.intp) * n_features, self.n_trees)
+        positions, deltas = [], []
+        for _ in range(self.max_depth):
+            # Leaves point to themselves, so walkers that already finished add a zero delta
+            position = row_offsets + self.feature.take(nodes)
+            go_right = flat_X.take(position) > self.threshold.take(nodes)
+            next_nodes = self.children.take(2 * nodes + go_right)
+            positions.append(position)
+            deltas.append(self.value.take(next_nodes, axis=0).astype(np.float64)
+                          - self.value.take(nodes, axis=0))
+            nodes = next_nodes
+
+        bias = self.value.take(self.roots, axis=0).mean(axis=0, dtype=np.float64)
+        contributions = np.zeros((n_rows * n_features, n_classes))
+        if positions:
+            positions = np.concatenate(positions)
+            deltas = np.concatenate(deltas)
+            for c in range(n_classes):
+                contributions[:, c] = np.bincount(positions, weights=deltas[:, c], minlength=n_rows * n_features)
+        return bias, contributions.reshape(n_rows, n_features, n_classes) / self.n_trees
+
+
+class PackedForestEngine:
+    """Fast-path preprocessing followed by the packed forest evaluator"""
+    name = "packed"
+
+    def __init__(self, encoder, forest: PackedForest, classes, manifest: dict = None):
+        self.encoder = encoder
+        self.forest = forest
+        self.classes_ = np.asarray(classes)
+        # Metadata of the model artifact this engine was loaded from, if any
+        self.manifest = manifest
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        fast = FastPathEngine.from_pipeline(pipeline)
+        return cls(fast.encoder, PackedForest.from_forest(fast.classifier), fast.classes_)
+
+    def encode(self, rows: list) -> np.ndarray:
+        """Preprocessing stage: rows to the forest's feature matrix"""
+        return self.encoder.transform(rows)
+
+    def predict_proba_features(self, X: np.ndarray) -> np.ndarray:
+        """Model stage: class probabilities for an encoded feature matrix"""
+        return self.forest.predict_proba(X)
+
+    def predict_proba_rows(self, rows: list) -> np.ndarray:
+        return self.predict_proba_features(self.encode(rows))
+
+    def explain_rows(self, rows: list):
+        """Tree-path attributions grouped by input column: (bias, contributions, columns).
+
+        contributions has shape (n_rows, len(columns), n_classes); one-hot
+        features are summed back into the categorical column they encode.
+        """
+        bias, contributions = self.forest.contributions(self.encode(rows))
+        return bias, self.encoder.group_features(contributions), self.encoder.columns
+
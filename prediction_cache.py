@@ -0,0 +1,91 @@
+"""In-process LRU/TTL cache for prediction results.
+
+Keys are a stable hash of the normalized input row (training column names,
+Current_Medications already converted to 0/1), so equivalent requests such as
+"Yes" and 1 share an entry. The cache remembers which model its entries came
+from and empties itself as soon as a different model is served.
+"""
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+import time
+
+
+def cache_key(row: dict) -> str:
+    """Stable hash of a normalized input row, independent of key order"""
+    canonical = json.dumps(row, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+
+
+class PredictionCache:
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 300.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.model_id = None
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def ensure_model(self, model_id: str):
+        """Drop every entry if they were computed by a different model"""
+        if model_id == self.model_id:
+            return
+        with self._lock:
+            if model_id != self.model_id:
+                if self.model_id is not None:
+                    self.invalidations += 1
+                self._entries.clear()
+                self.model_id = model_id
+
+    def get(self, key: str):
+        """Cached value for key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value, model_id: str = None):
+        """Store value; skipped if it was computed by a model other than the current one"""
+        with self._lock:
+            if model_id is not None and model_id != self.model_id:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "model_id": self.model_id,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations
+            }
@@ -0,0 +1,165 @@
+"""Prediction core shared by every API endpoint.
+
+Preprocessing and the forest run exactly once per call: the class label is
+taken from the argmax of predict_proba, which is what RandomForestClassifier
+.predict does internally, so calling predict and predict_proba separately only
+repeats the same work.
+
+pandas is only needed by the full-pipeline backend and is imported there, so
+serving a model artifact doesn't load it.
+"""
+from dataclasses import dataclass
+import os
+import pickle
+import time
+import numpy as np
+
+
+@dataclass
+class PredictionResult:
+    """Labels, probabilities and confidence for a batch of scored rows"""
+    classes: np.ndarray
+    probabilities: np.ndarray
+    labels: np.ndarray
+    confidence: np.ndarray
+
+    def __len__(self):
+        return len(self.labels)
+
+    def row(self, index: int) -> dict:
+        """Response payload for one scored row"""
+        return {
+            "premium_category": str(self.labels[index]),
+            "probabilities": {str(cls): float(prob) for cls, prob in zip(self.classes, self.probabilities[index])},
+            "confidence": float(self.confidence[index])
+        }
+
+    def rows(self) -> list:
+        return [self.row(i) for i in range(len(self))]
+
+
+def model_classes(pipeline) -> np.ndarray:
+    """Class labels of the classifier at the end of the pipeline"""
+    return pipeline.named_steps['classifier'].classes_
+
+
+def from_probabilities(classes, probabilities: np.ndarray) -> PredictionResult:
+    """Build a PredictionResult from a (n_rows, n_classes) probability matrix"""
+    predicted = probabilities.argmax(axis=1)
+    return PredictionResult(
+        classes=classes,
+        probabilities=probabilities,
+        labels=np.asarray(classes).take(predicted),
+        confidence=probabilities[np.arange(len(predicted)), predicted]
+    )
+
+
+def predict_frame(pipeline, input_df) -> PredictionResult:
+    """Score a DataFrame with training column names in a single pipeline pass"""
+    return from_probabilities(model_classes(pipeline), pipeline.predict_proba(input_df))
+
+
+class PipelineEngine:
+    """Scores rows through the full sklearn pipeline via a pandas DataFrame"""
+    name = "pipeline"
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+
+    @property
+    def classes_(self):
+        return model_classes(self.pipeline)
+
+    def encode(self, rows: list):
+        """Preprocessing stage: every step before the classifier, skipping fit-only samplers"""
+        import pandas as pd
+        X = pd.DataFrame(rows)
+        for _, step in self.pipeline.steps[:-1]:
+            if not hasattr(step, 'fit_resample'):
+                X = step.transform(X)
+        return X
+
+    def predict_proba_features(self, X) -> np.ndarray:
+        """Model stage: class probabilities for an encoded feature matrix"""
+        return self.pipeline.steps[-1][1].predict_proba(X)
+
+    def predict_proba_rows(self, rows: list) -> np.ndarray:
+        import pandas as pd
+        return self.pipeline.predict_proba(pd.DataFrame(rows))
+
+
+# Inference backends, fastest first; each one falls back to the next if it can't load the model
+BACKENDS = ("packed", "fast", "pipeline")
+
+
+def build_engine(pipeline, backend: str = "fast"):
+    """Wrap a trained pipeline in the requested inference backend.
+
+    "packed" evaluates the forest from flattened node arrays, "fast" skips
+    pandas and the ColumnTransformer, "pipeline" runs the full sklearn
+    pipeline. Falls back down that list when a backend can't reproduce the
+    pipeline.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown prediction backend '{backend}'. Expected one of {BACKENDS}")
+
+    from fast_engine import FastPathEngine, UnsupportedPipelineError
+    from packed_forest import PackedForestEngine
+    factories = {"packed": PackedForestEngine.from_pipeline, "fast": FastPathEngine.from_pipeline}
+
+    for name in BACKENDS[BACKENDS.index(backend):]:
+        if name == "pipeline":
+            return PipelineEngine(pipeline)
+        try:
+            return factories[name](pipeline)
+        except UnsupportedPipelineError as e:
+            print(f"⚠️ '{name}' backend unavailable ({e}); falling back")
+
+
+def load_engine(path: str, backend: str = None):
+    """Load a model artifact directory (memory-mapped) or a pickled pipeline into an engine.
+
+    backend defaults to "packed" for artifacts and "fast" for pickles. An
+    artifact only holds the flattened forest, so any other backend requested
+    for one is reported and replaced by "packed".
+    """
+    if backend is not None and backend not in BACKENDS:
+        raise ValueError(f"Unknown prediction backend '{backend}'. Expected one of {BACKENDS}")
+
+    if os.path.isdir(path):
+        from model_artifact import load_artifact
+        if backend not in (None, "packed"):
+            print(f"⚠️ '{backend}' backend requested, but {path} is a model artifact that only the "
+                  f"'packed' backend can serve; using 'packed' (point at a pickled pipeline to use '{backend}')")
+        return load_artifact(path)
+
+    with open(path, 'rb') as f:
+        pipeline = pickle.load(f)
+    return build_engine(pipeline, backend or "fast")
+
+
+def model_fingerprint(path: str) -> str:
+    """Identifier that changes whenever the model at path changes"""
+    from model_artifact import file_sha256, read_manifest
+    if os.path.isdir(path):
+        return read_manifest(path)["model_id"]
+    return file_sha256(path)[:16]
+
+
+def predict_rows(engine, rows: list, observe=None) -> PredictionResult:
+    """Score rows (dicts keyed by training column names) with an inference engine.
+
+    If observe is given, it is called as observe(seconds, stage) for the
+    "preprocess" and "model" stages.
+    """
+    if observe is None:
+        return from_probabilities(engine.classes_, engine.predict_proba_rows(rows))
+
+    start = time.perf_counter()
+    X = engine.encode(rows)
+    encoded = time.perf_counter()
+    probabilities = engine.predict_proba_features(X)
+    observe(encoded - start, "preprocess")
+    observe(time.perf_counter() - encoded, "model")
+    return from_probabilities(engine.classes_, probabilities)
+
@@ -0,0 +1,181 @@
+"""Streaming batch scoring of large CSV or Parquet files.
+
+Reads an input shaped like insurance_premium_dataset.csv in fixed-size
+chunks, normalizes the column names as model_train.py does, scores the chunks
+in a pool of worker processes and appends the predictions and class
+probabilities to an output CSV in input order. At most a few chunks are in
+memory at any time, so memory stays flat regardless of the input size.
+
+Progress is checkpointed next to the output after every chunk; rerunning the
+same command with --resume continues from the last completed chunk.
+
+Usage:
+    python score.py customers.csv scored.csv --chunk-size 50000 --workers 4
+    python score.py customers.parquet scored.csv --resume
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+import csv
+import json
+import os
+import sys
+import time
+import pandas as pd
+
+from feature_schema import CSV_OPTIONS, TARGET, normalize_columns
+from predictor import load_engine, model_fingerprint, predict_rows
+
+# Engine loaded once per worker process by the pool initializer
+_ENGINE = None
+
+
+def _init_worker(model_path: str, backend: str):
+    global _ENGINE
+    _ENGINE = load_engine(model_path, backend)
+
+
+def read_chunks(path: str, chunk_size: int, skip_rows: int = 0):
+    """Yield DataFrames of up to chunk_size rows from a CSV or Parquet file, after skip_rows rows"""
+    if path.endswith(('.parquet', '.pq')):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("❌ Reading Parquet requires pyarrow (pip install pyarrow)")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            if skip_rows >= batch.num_rows:
+                skip_rows -= batch.num_rows
+                continue
+            yield batch.to_pandas().iloc[skip_rows:]
+            skip_rows = 0
+    else:
+        # Skipping by row range keeps the header line; "None" stays a category as in training
+        yield from pd.read_csv(path, chunksize=chunk_size, skiprows=range(1, skip_rows + 1), **CSV_OPTIONS)
+
+
+def score_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    """Predicted category, confidence and per-class probabilities for a chunk"""
+    df = normalize_columns(df)
+    result = predict_rows(_ENGINE, df.drop(columns=[TARGET], errors='ignore').to_dict(orient='records'))
+    scored = pd.DataFrame(result.probabilities, columns=[f"probability_{cls}" for cls in result.classes],
+                          index=df.index)
+    scored.insert(0, "premium_category", result.labels)
+    scored.insert(1, "confidence", result.confidence)
+    return scored
+
+
+class Checkpoint:
+    """Rows completed and output size after the last chunk, stored in <output>.progress.json"""
+
+    def __init__(self, output_path: str, run: dict):
+        self.path = output_path + ".progress.json"
+        self.run = run
+        self.rows_done = 0
+        self.output_bytes = 0
+
+    def load(self) -> bool:
+        """Resume state of a previous run of the same input, model and chunk size, if any"""
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path) as f:
+            state = json.load(f)
+        if state["run"] != self.run:
+            raise SystemExit(f"❌ {self.path} belongs to a different input, model or chunk size; "
+                             f"remove it or run without --resume")
+        self.rows_done = state["rows_done"]
+        self.output_bytes = state["output_bytes"]
+        return True
+
+    def save(self, rows_done: int, output_bytes: int):
+        self.rows_done, self.output_bytes = rows_done, output_bytes
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"run": self.run, "rows_done": rows_done, "output_bytes": output_bytes}, f)
+        os.replace(tmp_path, self.path)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def run_info(args) -> dict:
+    stat = os.stat(args.input)
+    return {
+        "input": os.path.abspath(args.input),
+        "input_size": stat.st_size,
+        "input_mtime_ns": stat.st_mtime_ns,
+        "model_id": model_fingerprint(args.model),
+        "chunk_size": args.chunk_size
+    }
+
+
+def score_file(args):
+    checkpoint = Checkpoint(args.output, run_info(args))
+    resuming = args.resume and os.path.exists(args.output) and checkpoint.load()
+    if resuming:
+        print(f"↩️ Resuming after {checkpoint.rows_done} rows")
+
+    # Truncating to the checkpointed size drops any partially written chunk
+    output = open(args.output, 'r+b' if resuming else 'wb')
+    output.truncate(checkpoint.output_bytes)
+    output.seek(checkpoint.output_bytes)
+
+    rows_done = checkpoint.rows_done
+    rows_this_run = 0
+    start = time.perf_counter()
+    max_pending = args.workers * 2
+
+    def write(scored: pd.DataFrame):
+        nonlocal rows_done, rows_this_run
+        data = scored.to_csv(index=False, header=(rows_done == 0), quoting=csv.QUOTE_MINIMAL).encode()
+        output.write(data)
+        output.flush()
+        os.fsync(output.fileno())
+        rows_done += len(scored)
+        rows_this_run += len(scored)
+        checkpoint.save(rows_done, output.tell())
+        elapsed = time.perf_counter() - start
+        print(f"📝 {rows_done} rows scored ({rows_this_run / elapsed:,.0f} rows/s)", flush=True)
+
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                                 initargs=(args.model, args.backend)) as pool:
+            # Bounded window of in-flight chunks, written back in input order
+            pending = deque()
+            for chunk in read_chunks(args.input, args.chunk_size, skip_rows=checkpoint.rows_done):
+                pending.append(pool.submit(score_chunk, chunk))
+                if len(pending) >= max_pending:
+                    write(pending.popleft().result())
+                while pending and pending[0].done():
+                    write(pending.popleft().result())
+            while pending:
+                write(pending.popleft().result())
+    finally:
+        output.close()
+
+    elapsed = time.perf_counter() - start
+    checkpoint.remove()
+    print(f"✅ Scored {rows_this_run} rows in {elapsed:.1f} s "
+          f"({rows_this_run / elapsed if elapsed else 0:,.0f} rows/s); {rows_done} rows in {args.output}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a CSV or Parquet file with the insurance premium model")
+    parser.add_argument("input", help="CSV or Parquet file with the training columns")
+    parser.add_argument("output", help="CSV file for predictions and class probabilities")
+    parser.add_argument("--model", default=os.getenv("MODEL_PATH", "insurance_model" if os.path.isdir("insurance_model")
+                                                       else "insurance_model.pkl"),
+                        help="Model artifact (default; its packed backend is the fastest on large chunks) "
+                             "or pickled pipeline")
+    parser.add_argument("--backend", default=os.getenv("PREDICT_BACKEND"),
+                        help="Inference backend (packed, fast or pipeline); default packed for artifacts, "
+                             "fast for pickles")
+    parser.add_argument("--chunk-size", type=int, default=20000, help="Rows read and scored per chunk")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Scoring processes")
+    parser.add_argument("--resume", action="store_true", help="Continue a partly finished run into the same output")
+    args = parser.parse_args(argv)
+    score_file(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
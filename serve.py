@@ -0,0 +1,157 @@
+"""Production server: load the model once, then fork workers that share it.
+
+The parent process imports the FastAPI app, loads the model, binds the
+listening socket and forks N uvicorn workers. Workers inherit the loaded model
+copy-on-write instead of each loading their own, and every worker limits
+BLAS/OpenMP to a fixed number of threads so N workers don't oversubscribe the
+cores. Admin actions (model reloads, profiling) that reach one worker are
+passed on to the others through a shared control file (see worker_control.py),
+and every worker's /metrics reports the totals of all workers.
+
+Usage:
+    python app.py serve --workers 4 --threads-per-worker 1
+    python serve.py --workers 4
+"""
+import argparse
+import gc
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+
+import worker_control
+from instrumentation import shared_metrics
+from worker_control import CONTROL_SIGNAL
+
+# Environment variables read by BLAS/OpenMP runtimes when they are first loaded
+THREAD_LIMIT_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Serve the Insurance Premium Prediction API with pre-forked workers")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (0.0.0.0 to accept remote clients)")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Number of worker processes")
+    parser.add_argument("--threads-per-worker", type=int, default=1,
+                        help="BLAS/OpenMP threads allowed in each worker")
+    parser.add_argument("--backlog", type=int, default=2048, help="Listen backlog of the shared socket")
+    parser.add_argument("--log-level", default="info")
+    return parser.parse_args(argv)
+
+
+def limit_threads(threads: int):
+    """Cap native thread pools for libraries loaded from now on"""
+    for var in THREAD_LIMIT_VARS:
+        os.environ[var] = str(threads)
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock: socket.socket, args):
+    """Body of a forked worker: apply thread limits and serve on the shared socket"""
+    import uvicorn
+    from threadpoolctl import threadpool_limits
+
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    # Ignored until the app installs its handler at startup (and then catches up on the control file)
+    signal.signal(CONTROL_SIGNAL, signal.SIG_IGN)
+    signal.pthread_sigmask(signal.SIG_UNBLOCK, {CONTROL_SIGNAL})
+    # Pools already loaded in the parent (numpy's BLAS, sklearn's OpenMP) ignore the env vars
+    threadpool_limits(limits=args.threads_per_worker)
+
+    config = uvicorn.Config(app, host=args.host, port=args.port, log_level=args.log_level)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def serve(app, argv=None):
+    """Fork args.workers workers serving app on one shared socket and supervise them"""
+    args = parse_args(argv)
+    limit_threads(args.threads_per_worker)
+    sock = bind_socket(args.host, args.port, args.backlog)
+
+    # Objects allocated so far (including the model) are never collected, so the
+    # garbage collector doesn't touch their pages and trigger copy-on-write in workers
+    gc.freeze()
+
+    # Shared by the workers: the control file admin actions are passed on through,
+    # and the metrics snapshots every worker's /metrics adds up
+    run_dir = tempfile.mkdtemp(prefix="insurance-api-")
+    worker_control.control.path = os.path.join(run_dir, "control.json")
+    open(worker_control.control.path, "w").close()
+    shared_metrics.directory = os.path.join(run_dir, "metrics")
+    os.makedirs(shared_metrics.directory)
+
+    workers = {}
+    stopping = False
+
+    def spawn():
+        # The control signal stays blocked until the child has replaced the parent's handler
+        signal.pthread_sigmask(signal.SIG_BLOCK, {CONTROL_SIGNAL})
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(app, sock, args)
+            finally:
+                os._exit(0)
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, {CONTROL_SIGNAL})
+        workers[pid] = True
+        print(f"👷 Worker {pid} started")
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def forward_control(signum, frame):
+        for pid in list(workers):
+            try:
+                os.kill(pid, CONTROL_SIGNAL)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(CONTROL_SIGNAL, forward_control)
+
+    print(f"🚀 Serving on http://{args.host}:{args.port} with {args.workers} workers "
+          f"({args.threads_per_worker} thread(s) each)")
+    for _ in range(args.workers):
+        spawn()
+
+    # Restart workers that die unexpectedly until asked to stop
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        workers.pop(pid, None)
+        if not stopping:
+            print(f"⚠️ Worker {pid} exited with status {status}; restarting")
+            spawn()
+
+    sock.close()
+    shutil.rmtree(run_dir, ignore_errors=True)
+    print("👋 All workers stopped")
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    # Set thread limits before numpy/sklearn are imported by the app
+    limit_threads(args.threads_per_worker)
+    from app import app, load_model
+    load_model()
+    serve(app, sys.argv[1:])
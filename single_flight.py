@@ -0,0 +1,37 @@
+"""Single-flight deduplication of concurrent identical computations.
+
+The first caller with a key starts the computation as its own task; callers
+that arrive with the same key while it is running wait for that task instead of
+starting another, and all get its result (or its exception). The key is
+forgotten as soon as the computation finishes, so this only merges requests
+that overlap in time; remembering results is the prediction cache's job.
+
+The shared task is shielded from its callers: a caller that is cancelled (a
+client that disconnects) stops waiting without cancelling the computation the
+others are waiting for.
+"""
+import asyncio
+from typing import Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    def __init__(self, on_coalesced: Callable[[Hashable], None] = None):
+        """on_coalesced(key) is called for every caller that joins a computation already in flight"""
+        self.on_coalesced = on_coalesced
+        self._in_flight = {}  # key -> asyncio.Task
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]):
+        """Result of fn(), shared with every concurrent caller using the same key"""
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        elif self.on_coalesced is not None:
+            self.on_coalesced(key)
+        return await asyncio.shield(task)
+
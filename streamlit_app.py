@@ -1,5 +1,6 @@
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import pandas as pd
 import plotly.express as px
@@ -7,6 +8,8 @@ import plotly.express as px
 # Configuration
 API_URL = "http://localhost:8000/predict"
 HEALTH_URL = "http://localhost:8000/health"
+SWEEP_URL = "http://localhost:8000/predict/sweep"
+HEALTH_CHECK_TTL = 15  # seconds a health check result is reused across reruns
 
 # Page configuration
 st.set_page_config(
@@ -58,18 +61,35 @@ st.markdown("""
 st.markdown('<h1 class="main-header">🏥 Insurance Premium Category Predictor</h1>', unsafe_allow_html=True)
 st.markdown("### Enter your personal and health details to predict your insurance premium category")
 
+@st.cache_resource
+def get_session() -> requests.Session:
+    """One pooled HTTP session shared by every rerun and browser session, so connections are kept alive"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=10)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+@st.cache_data(ttl=HEALTH_CHECK_TTL, show_spinner=False)
+def check_health() -> str:
+    """API/model status, probed at most once per HEALTH_CHECK_TTL instead of on every rerun"""
+    try:
+        health_response = get_session().get(HEALTH_URL, timeout=5)
+    except requests.exceptions.RequestException:
+        return "unreachable"
+    if health_response.status_code != 200:
+        return "failed"
+    return "healthy" if health_response.json().get("model_status") == "healthy" else "degraded"
+
 # Check API health
-try:
-    health_response = requests.get(HEALTH_URL, timeout=5)
-    if health_response.status_code == 200:
-        health_data = health_response.json()
-        if health_data.get("model_status") == "healthy":
-            st.success("✅ API is connected and model is ready!")
-        else:
-            st.warning("⚠️ API is connected but model may not be loaded properly.")
-    else:
-        st.error("❌ API health check failed.")
-except:
+health_status = check_health()
+if health_status == "healthy":
+    st.success("✅ API is connected and model is ready!")
+elif health_status == "degraded":
+    st.warning("⚠️ API is connected but model may not be loaded properly.")
+elif health_status == "failed":
+    st.error("❌ API health check failed.")
+else:
     st.error("❌ Cannot connect to API. Make sure FastAPI server is running on port 8000.")
 
 # Sidebar for navigation and info
@@ -199,126 +219,135 @@ with col1:
                                                min_value=0.0, value=0.0,
                                                help="Premium amount paid in the last year")
 
+def render_prediction(result: dict):
+    """Show the predicted category, probability chart and risk factors for an API result"""
+    predicted_category = result.get('premium_category', 'Unknown')
+    confidence = result.get('confidence', 0)
+    probabilities = result.get('probabilities', {})
+
+    # Display main result
+    if predicted_category == "Low":
+        st.markdown(f'''
+        <div class="result-box success-box">
+            <h3 style="color: #155724;">✅ Predicted Category: {predicted_category}</h3>
+            <p style="color: #155724;"><strong>Confidence:</strong> {confidence:.2%}</p>
+            <p style="color: #155724;">Great news! You qualify for lower premium rates.</p>
+        </div>
+        ''', unsafe_allow_html=True)
+    elif predicted_category == "Medium":
+        st.markdown(f'''
+        <div class="result-box warning-box">
+            <h3 style="color: #856404;">⚡ Predicted Category: {predicted_category}</h3>
+            <p style="color: #856404;"><strong>Confidence:</strong> {confidence:.2%}</p>
+            <p style="color: #856404;">You qualify for standard premium rates.</p>
+        </div>
+        ''', unsafe_allow_html=True)
+    else:  # High
+        st.markdown(f'''
+        <div class="result-box error-box">
+            <h3 style="color: #721c24;">⚠️ Predicted Category: {predicted_category}</h3>
+            <p style="color: #721c24;"><strong>Confidence:</strong> {confidence:.2%}</p>
+            <p style="color: #721c24;">Higher premium rates may apply due to risk factors.</p>
+        </div>
+        ''', unsafe_allow_html=True)
+
+    # Display probability breakdown
+    st.markdown("### 📊 Probability Breakdown")
+
+    # Create a DataFrame for the chart
+    prob_df = pd.DataFrame(list(probabilities.items()), columns=['Category', 'Probability'])
+    prob_df['Probability_Percent'] = prob_df['Probability'] * 100
+
+    # Create bar chart
+    fig = px.bar(prob_df, x='Category', y='Probability_Percent',
+               title='Premium Category Probabilities',
+               color='Category',
+               color_discrete_map={'Low': '#28a745', 'Medium': '#ffc107', 'High': '#dc3545'})
+    fig.update_layout(
+        showlegend=False, 
+        height=300,
+        yaxis_title='Probability (%)',
+        xaxis_title='Premium Category'
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+    # Display detailed probabilities
+    for category, probability in probabilities.items():
+        st.write(f"**{category}:** {probability:.2%}")
+
+    # Risk factors analysis
+    st.markdown("### 🔍 Risk Factor Analysis")
+    risk_factors = []
+
+    if smoking_status == "Current":
+        risk_factors.append("Current smoker")
+    if alcohol_consumption == "Regular":
+        risk_factors.append("Regular alcohol consumption")
+    if stress_level == "High":
+        risk_factors.append("High stress level")
+    if pollution_exposure == "High":
+        risk_factors.append("High pollution exposure")
+    if preexisting_condition != "None":
+        risk_factors.append(f"Preexisting condition: {preexisting_condition}")
+    if bmi > 30:
+        risk_factors.append("BMI indicates obesity")
+    if physical_activity < 2:
+        risk_factors.append("Low physical activity")
+
+    if risk_factors:
+        st.markdown("**Identified Risk Factors:**")
+        for factor in risk_factors:
+            st.write(f"• {factor}")
+    else:
+        st.success("✅ No major risk factors identified!")
+
 with col2:
     st.markdown('<div class="section-header">🎯 Prediction Results</div>', unsafe_allow_html=True)
     
+    # Prepare input data
+    input_data = {
+        "Age": age,
+        "Gender": gender,
+        "Marital_Status": marital_status,
+        "Occupation": occupation,
+        "Education": education,
+        "Monthly_Income": monthly_income,
+        "Area_Type": area_type,
+        "BMI": bmi,
+        "Smoking_Status": smoking_status,
+        "Alcohol_Consumption": alcohol_consumption,
+        "Physical_Activity_hr_wk": physical_activity,
+        "Sleep_hr_day": sleep_hours,
+        "Family_History": family_history,
+        "Preexisting_Condition": preexisting_condition,
+        "Doctor_Visits_Last_Year": doctor_visits,
+        "Current_Medications": current_medications,
+        "Stress_Level": stress_level,
+        "Pollution_Exposure": pollution_exposure,
+        "Food_Habit": food_habit,
+        "Claim_History": claim_history,
+        "Claim_Amount_Last_Year": claim_amount_last_year,
+        "Insurance_Type": insurance_type,
+        "Policy_Tenure": policy_tenure,
+        "Premium_Paid_Last_Year": premium_paid_last_year,
+        "Loyalty_Score": loyalty_score
+    }
+    
+    # The last prediction is kept per browser session, so reruns caused by widget edits
+    # neither lose it nor call the API again while the inputs are unchanged
+    last_prediction = st.session_state.get("last_prediction")
+    inputs_unchanged = last_prediction is not None and last_prediction["input"] == input_data
+    
     # Prediction button
-    if st.button("🔮 Predict Premium Category", type="primary", use_container_width=True):
-        # Prepare input data
-        input_data = {
-            "Age": age,
-            "Gender": gender,
-            "Marital_Status": marital_status,
-            "Occupation": occupation,
-            "Education": education,
-            "Monthly_Income": monthly_income,
-            "Area_Type": area_type,
-            "BMI": bmi,
-            "Smoking_Status": smoking_status,
-            "Alcohol_Consumption": alcohol_consumption,
-            "Physical_Activity_hr_wk": physical_activity,
-            "Sleep_hr_day": sleep_hours,
-            "Family_History": family_history,
-            "Preexisting_Condition": preexisting_condition,
-            "Doctor_Visits_Last_Year": doctor_visits,
-            "Current_Medications": current_medications,
-            "Stress_Level": stress_level,
-            "Pollution_Exposure": pollution_exposure,
-            "Food_Habit": food_habit,
-            "Claim_History": claim_history,
-            "Claim_Amount_Last_Year": claim_amount_last_year,
-            "Insurance_Type": insurance_type,
-            "Policy_Tenure": policy_tenure,
-            "Premium_Paid_Last_Year": premium_paid_last_year,
-            "Loyalty_Score": loyalty_score
-        }
-        
+    if st.button("🔮 Predict Premium Category", type="primary", use_container_width=True) and not inputs_unchanged:
         try:
             # Make API request
             with st.spinner("🔄 Processing your data..."):
-                response = requests.post(API_URL, json=input_data, timeout=30)
+                response = get_session().post(API_URL, json=input_data, timeout=30)
             
             if response.status_code == 200:
-                result = response.json()
-                predicted_category = result.get('premium_category', 'Unknown')
-                confidence = result.get('confidence', 0)
-                probabilities = result.get('probabilities', {})
-                
-                # Display main result
-                if predicted_category == "Low":
-                    st.markdown(f'''
-                    <div class="result-box success-box">
-                        <h3 style="color: #155724;">✅ Predicted Category: {predicted_category}</h3>
-                        <p style="color: #155724;"><strong>Confidence:</strong> {confidence:.2%}</p>
-                        <p style="color: #155724;">Great news! You qualify for lower premium rates.</p>
-                    </div>
-                    ''', unsafe_allow_html=True)
-                elif predicted_category == "Medium":
-                    st.markdown(f'''
-                    <div class="result-box warning-box">
-                        <h3 style="color: #856404;">⚡ Predicted Category: {predicted_category}</h3>
-                        <p style="color: #856404;"><strong>Confidence:</strong> {confidence:.2%}</p>
-                        <p style="color: #856404;">You qualify for standard premium rates.</p>
-                    </div>
-                    ''', unsafe_allow_html=True)
-                else:  # High
-                    st.markdown(f'''
-                    <div class="result-box error-box">
-                        <h3 style="color: #721c24;">⚠️ Predicted Category: {predicted_category}</h3>
-                        <p style="color: #721c24;"><strong>Confidence:</strong> {confidence:.2%}</p>
-                        <p style="color: #721c24;">Higher premium rates may apply due to risk factors.</p>
-                    </div>
-                    ''', unsafe_allow_html=True)
-                
-                # Display probability breakdown
-                st.markdown("### 📊 Probability Breakdown")
-                
-                # Create a DataFrame for the chart
-                prob_df = pd.DataFrame(list(probabilities.items()), columns=['Category', 'Probability'])
-                prob_df['Probability_Percent'] = prob_df['Probability'] * 100
-                
-                # Create bar chart
-                fig = px.bar(prob_df, x='Category', y='Probability_Percent',
-                           title='Premium Category Probabilities',
-                           color='Category',
-                           color_discrete_map={'Low': '#28a745', 'Medium': '#ffc107', 'High': '#dc3545'})
-                fig.update_layout(
-                    showlegend=False, 
-                    height=300,
-                    yaxis_title='Probability (%)',
-                    xaxis_title='Premium Category'
-                )
-                st.plotly_chart(fig, use_container_width=True)
-                
-                # Display detailed probabilities
-                for category, probability in probabilities.items():
-                    st.write(f"**{category}:** {probability:.2%}")
-                
-                # Risk factors analysis
-                st.markdown("### 🔍 Risk Factor Analysis")
-                risk_factors = []
-                
-                if smoking_status == "Current":
-                    risk_factors.append("Current smoker")
-                if alcohol_consumption == "Regular":
-                    risk_factors.append("Regular alcohol consumption")
-                if stress_level == "High":
-                    risk_factors.append("High stress level")
-                if pollution_exposure == "High":
-                    risk_factors.append("High pollution exposure")
-                if preexisting_condition != "None":
-                    risk_factors.append(f"Preexisting condition: {preexisting_condition}")
-                if bmi > 30:
-                    risk_factors.append("BMI indicates obesity")
-                if physical_activity < 2:
-                    risk_factors.append("Low physical activity")
-                
-                if risk_factors:
-                    st.markdown("**Identified Risk Factors:**")
-                    for factor in risk_factors:
-                        st.write(f"• {factor}")
-                else:
-                    st.success("✅ No major risk factors identified!")
+                st.session_state["last_prediction"] = {"input": input_data, "result": response.json()}
+                inputs_unchanged = True
                 
             else:
                 error_detail = response.json().get('detail', 'Unknown error') if response.headers.get('content-type') == 'application/json' else response.text
@@ -330,6 +359,96 @@ with col2:
             st.error("❌ Request timed out. The server might be overloaded.")
         except Exception as e:
             st.error(f"❌ An unexpected error occurred: {str(e)}")
+    
+    if inputs_unchanged:
+        render_prediction(st.session_state["last_prediction"]["result"])
+    elif last_prediction is not None:
+        st.info("✏️ Inputs changed since the last prediction. Click 'Predict Premium Category' to update it.")
+
+# What-if analysis: sweep one or two fields around the current inputs in a single API call
+SWEEP_NUMERIC_FIELDS = {
+    "BMI": (15.0, 45.0),
+    "Monthly_Income": (1000.0, 200000.0),
+    "Age": (18.0, 90.0),
+    "Physical_Activity_hr_wk": (0.5, 20.0),
+    "Sleep_hr_day": (3.0, 12.0),
+    "Doctor_Visits_Last_Year": (1.0, 20.0),
+    "Claim_Amount_Last_Year": (0.0, 100000.0),
+    "Premium_Paid_Last_Year": (0.0, 50000.0),
+    "Loyalty_Score": (0.05, 1.0)
+}
+SWEEP_CATEGORICAL_FIELDS = {
+    "Smoking_Status": ["Never", "Former", "Current"],
+    "Alcohol_Consumption": ["Never", "Occasional", "Regular"],
+    "Stress_Level": ["Low", "Moderate", "High"],
+    "Pollution_Exposure": ["Low", "Moderate", "High"],
+    "Preexisting_Condition": ["None", "Asthma", "Diabetes", "Hypertension", "Heart Disease"],
+    "Insurance_Type": ["Basic", "Comprehensive", "Family", "Critical Illness"],
+    "Food_Habit": ["Home-cooked", "Mixed", "Mostly Restaurant"]
+}
+
+def sweep_axis(field: str, steps: int) -> dict:
+    if field in SWEEP_CATEGORICAL_FIELDS:
+        return {"field": field, "values": SWEEP_CATEGORICAL_FIELDS[field]}
+    start, stop = SWEEP_NUMERIC_FIELDS[field]
+    return {"field": field, "start": start, "stop": stop, "steps": steps}
+
+with st.expander("🔬 What-if Analysis"):
+    st.markdown("See how the predicted probabilities change when one or two fields vary and everything else stays as entered above.")
+    sweep_fields = list(SWEEP_NUMERIC_FIELDS) + list(SWEEP_CATEGORICAL_FIELDS)
+    sweep_col1, sweep_col2, sweep_col3 = st.columns(3)
+    with sweep_col1:
+        sweep_x = st.selectbox("Field to vary", options=sweep_fields, index=0)
+    with sweep_col2:
+        sweep_y = st.selectbox("Second field (optional)", options=["None"] + [f for f in sweep_fields if f != sweep_x])
+    with sweep_col3:
+        sweep_steps = st.slider("Steps per numeric field", min_value=5, max_value=50, value=25)
+    sweep_class = st.radio("Probability to plot", options=["High", "Medium", "Low"], horizontal=True)
+
+    axes = [sweep_axis(sweep_x, sweep_steps)]
+    if sweep_y != "None":
+        axes.append(sweep_axis(sweep_y, sweep_steps))
+    sweep_payload = {"base": input_data, "axes": axes}
+
+    # Like predictions, the last sweep is reused while its request is unchanged
+    last_sweep = st.session_state.get("last_sweep")
+    sweep_unchanged = last_sweep is not None and last_sweep["request"] == sweep_payload
+
+    if st.button("📈 Run What-if Sweep") and not sweep_unchanged:
+        try:
+            with st.spinner("🔄 Scoring all variants..."):
+                response = get_session().post(SWEEP_URL, json=sweep_payload, timeout=60)
+            if response.status_code == 200:
+                st.session_state["last_sweep"] = {"request": sweep_payload, "result": response.json()}
+                sweep_unchanged = True
+            else:
+                st.error(f"❌ API Error: {response.status_code}\n\n{response.text}")
+        except requests.exceptions.RequestException as e:
+            st.error(f"❌ Could not run the sweep: {str(e)}")
+
+    if sweep_unchanged:
+        sweep = st.session_state["last_sweep"]["result"]
+        probabilities = sweep["probabilities"][sweep_class]
+        x_axis = sweep["axes"][0]
+        if len(sweep["axes"]) == 1:
+            curve_df = pd.DataFrame({x_axis["field"]: x_axis["values"]})
+            for category, values in sweep["probabilities"].items():
+                curve_df[category] = [value * 100 for value in values]
+            fig = px.line(curve_df, x=x_axis["field"], y=list(sweep["probabilities"]), markers=True,
+                          title=f"Premium category probabilities vs {x_axis['field']}",
+                          color_discrete_map={'Low': '#28a745', 'Medium': '#ffc107', 'High': '#dc3545'})
+            fig.update_layout(yaxis_title='Probability (%)', legend_title='Category')
+        else:
+            y_axis = sweep["axes"][1]
+            # Rows of the response follow the first axis; plot it along x
+            fig = px.imshow([list(row) for row in zip(*probabilities)], x=x_axis["values"], y=y_axis["values"],
+                            labels={"x": x_axis["field"], "y": y_axis["field"], "color": f"P({sweep_class})"},
+                            color_continuous_scale="RdYlGn_r", aspect="auto", origin="lower",
+                            title=f"Probability of {sweep_class} premium")
+        st.plotly_chart(fig, use_container_width=True)
+        st.caption(f"{sweep['points']} variants scored in one request (model {sweep['model_version']})")
+    elif last_sweep is not None:
+        st.info("✏️ Inputs or sweep settings changed. Click 'Run What-if Sweep' to update the chart.")
 
 # Footer
 st.markdown("---")
@@ -345,6 +464,7 @@ with st.expander("🛠️ Debug Information"):
     st.markdown("### API Endpoints")
     st.code(f"Prediction API: {API_URL}")
     st.code(f"Health Check API: {HEALTH_URL}")
+    st.code(f"What-if Sweep API: {SWEEP_URL}")
     
     st.markdown("### Sample Input Format")
     sample_input = {
@@ -0,0 +1,86 @@
+"""Shared fixtures: a small model trained like model_train.py's, on the bundled dataset.
+
+The forest is kept small so the suite runs in seconds; every test compares
+code paths against each other on the same model, which doesn't need a full-size
+one.
+"""
+import importlib
+import os
+import pickle
+import sys
+
+import pytest
+from pydantic import ValidationError
+
+from feature_schema import TARGET, build_preprocessor, read_training_csv
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_PATH = os.path.join(ROOT, "insurance_premium_dataset.csv")
+
+
+@pytest.fixture(scope="session")
+def training_data():
+    """(X, y) of the bundled dataset, with training column names"""
+    df = read_training_csv(DATA_PATH)
+    return df.drop(columns=[TARGET]), df[TARGET]
+
+
+@pytest.fixture(scope="session")
+def pipeline(training_data):
+    """The model_train.py pipeline with a small forest, fitted on the whole dataset"""
+    from imblearn.over_sampling import SMOTE
+    from imblearn.pipeline import Pipeline as ImbPipeline
+    from sklearn.ensemble import RandomForestClassifier
+
+    X, y = training_data
+    return ImbPipeline([
+        ('preprocessor', build_preprocessor()),
+        ('smote', SMOTE(random_state=42)),
+        ('classifier', RandomForestClassifier(
+            n_estimators=20, max_depth=10, min_samples_leaf=2, class_weight='balanced_subsample', random_state=42
+        ))
+    ]).fit(X, y)
+
+
+@pytest.fixture(scope="session")
+def model_files(pipeline, tmp_path_factory):
+    """{"pickle": path, "artifact": path} of the fixture model saved both ways"""
+    from model_artifact import save_artifact
+
+    directory = tmp_path_factory.mktemp("model")
+    paths = {"pickle": str(directory / "insurance_model.pkl"), "artifact": str(directory / "insurance_model")}
+    with open(paths["pickle"], 'wb') as f:
+        pickle.dump(pipeline, f)
+    save_artifact(pipeline, paths["artifact"])
+    return paths
+
+
+@pytest.fixture(scope="module")
+def api(model_files):
+    """A fresh import of the app module serving the fixture artifact.
+
+    The prediction cache is off, so repeated inputs are always scored.
+    """
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("MODEL_PATH", model_files["artifact"])
+        mp.setenv("MODEL_WARMUP_DATA", DATA_PATH)
+        mp.setenv("PREDICT_CACHE_SIZE", "0")
+        mp.setenv("PREDICT_COALESCE", "1")
+        sys.modules.pop("app", None)
+        yield importlib.import_module("app")
+    sys.modules.pop("app", None)
+
+
+@pytest.fixture(scope="module")
+def user_inputs(api):
+    """Valid /predict bodies drawn from the bundled dataset"""
+    from model_manager import read_sample_records
+
+    payloads = []
+    for record in read_sample_records(DATA_PATH, 200):
+        try:
+            api.UserInput.model_validate(record)
+        except ValidationError:
+            continue
+        payloads.append({field: record[field] for field in api.UserInput.model_fields})
+    return payloads
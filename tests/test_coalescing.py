@@ -0,0 +1,103 @@
+"""Concurrency harness for /predict's coalescing of identical in-flight requests.
+
+Bursts of concurrent requests with a few distinct bodies are sent to the app
+in-process. Every response must carry the prediction of its own input, and
+every request must be accounted for: rows the model scored plus requests that
+were coalesced equals requests sent.
+"""
+import asyncio
+import json
+import random
+
+import httpx
+import pytest
+
+from instrumentation import BATCH_SIZE, COALESCED
+
+BURSTS, BURST_SIZE, DISTINCT = 10, 32, 4
+
+
+@pytest.fixture(scope="module")
+def payloads(user_inputs):
+    return user_inputs[:BURSTS * DISTINCT]
+
+
+def send_bursts(api, payloads: list) -> dict:
+    """Send the bursts; {"responses": [(payload, status, body), ...], "rows_scored": n, "coalesced": n}"""
+    rng = random.Random(42)
+
+    async def run():
+        responses = []
+        async with api.app.router.lifespan_context(api.app), \
+                httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://test") as client:
+            _, rows_before = BATCH_SIZE.totals()
+            coalesced_before = COALESCED.value(api.PRIMARY)
+
+            async def send(payload):
+                response = await client.post("/predict", json=payload)
+                responses.append((payload, response.status_code, response.json()))
+
+            for burst in range(BURSTS):
+                distinct = payloads[burst * DISTINCT:(burst + 1) * DISTINCT]
+                burst_payloads = [distinct[i % DISTINCT] for i in range(BURST_SIZE)]
+                rng.shuffle(burst_payloads)
+                await asyncio.gather(*[send(payload) for payload in burst_payloads])
+            return {
+                "responses": responses,
+                "rows_scored": int(BATCH_SIZE.totals()[1] - rows_before),
+                "coalesced": int(COALESCED.value(api.PRIMARY) - coalesced_before)
+            }
+
+    return asyncio.run(run())
+
+
+def expected_predictions(api, payloads: list) -> dict:
+    """Each distinct payload's prediction, scored on its own"""
+    model = api.model_manager.current
+    expected = {}
+    for payload in payloads:
+        prediction = api.score_rows([api.prepare_input(api.UserInput.model_validate(payload))], model)[0]
+        expected[json.dumps(payload, sort_keys=True)] = (prediction["premium_category"], prediction["probabilities"])
+    return expected
+
+
+def check_responses(api, payloads: list, result: dict):
+    expected = expected_predictions(api, payloads)
+    for payload, status, body in result["responses"]:
+        assert status == 200, body
+        assert (body["premium_category"], body["probabilities"]) == expected[json.dumps(payload, sort_keys=True)]
+    assert result["rows_scored"] + result["coalesced"] == BURSTS * BURST_SIZE
+
+
+def test_identical_concurrent_requests_share_one_scoring(api, payloads):
+    result = send_bursts(api, payloads)
+    check_responses(api, payloads, result)
+    assert result["coalesced"] > 0
+    assert result["rows_scored"] >= BURSTS * DISTINCT
+
+
+def test_without_coalescing_every_request_is_scored(api, payloads, monkeypatch):
+    monkeypatch.setattr(api, "in_flight_predictions", None)
+    result = send_bursts(api, payloads)
+    check_responses(api, payloads, result)
+    assert result["coalesced"] == 0
+
+
+def test_a_failed_scoring_fails_every_request_that_shared_it(api, payloads, monkeypatch):
+    calls = []
+
+    async def failing_score(*args):
+        calls.append(args)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("model exploded")
+
+    monkeypatch.setattr(api, "score_prediction", failing_score)
+
+    async def run():
+        async with api.app.router.lifespan_context(api.app), \
+                httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://test") as client:
+            return await asyncio.gather(*[client.post("/predict", json=payloads[0]) for _ in range(8)])
+
+    responses = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(response.status_code == 500 and "model exploded" in response.json()["detail"] for response in responses)
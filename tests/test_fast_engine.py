@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from fast_engine import FastPathEngine, UnsupportedPipelineError
+
+
+def preprocessed(pipeline, X) -> np.ndarray:
+    features = pipeline.named_steps['preprocessor'].transform(X)
+    return features.toarray() if hasattr(features, 'toarray') else features
+
+
+def test_encoded_features_match_the_preprocessor(pipeline, training_data):
+    X, _ = training_data
+    engine = FastPathEngine.from_pipeline(pipeline)
+    assert np.array_equal(engine.encoder.transform(X.to_dict(orient='records')), preprocessed(pipeline, X))
+
+
+def test_probabilities_match_the_pipeline(pipeline, training_data):
+    X, _ = training_data
+    engine = FastPathEngine.from_pipeline(pipeline)
+    assert np.array_equal(engine.predict_proba_rows(X.to_dict(orient='records')), pipeline.predict_proba(X))
+
+
+def test_unknown_categories_encode_like_handle_unknown_ignore(pipeline, training_data):
+    X, _ = training_data
+    X = X.head(5).copy()
+    X['occupation'] = "Astronaut"
+    engine = FastPathEngine.from_pipeline(pipeline)
+    assert np.array_equal(engine.encoder.transform(X.to_dict(orient='records')), preprocessed(pipeline, X))
+
+
+def test_pipelines_it_cant_reproduce_are_refused(pipeline):
+    with pytest.raises(UnsupportedPipelineError):
+        FastPathEngine.from_pipeline(pipeline.named_steps['classifier'])
@@ -0,0 +1,43 @@
+import os
+
+import numpy as np
+
+from model_artifact import load_artifact, read_manifest, save_artifact
+
+
+def versions(path) -> list:
+    parent, name = os.path.split(str(path))
+    return sorted(entry for entry in os.listdir(parent) if entry.startswith(f".{name}-"))
+
+
+def test_saving_repoints_a_symlink_and_keeps_the_previous_version(pipeline, training_data, tmp_path):
+    rows = training_data[0].head(50).to_dict(orient='records')
+    path = tmp_path / "model"
+
+    first = save_artifact(pipeline, str(path))
+    first_version = os.readlink(path)
+    assert versions(path) == [first_version]
+
+    second = save_artifact(pipeline, str(path), metrics={"run": 2})
+    assert os.path.islink(path) and os.readlink(path) != first_version
+    assert read_manifest(str(path))["metrics"] == {"run": 2}
+    assert second["model_id"] == first["model_id"]
+    assert versions(path) == sorted([first_version, os.readlink(path)])
+
+    save_artifact(pipeline, str(path))
+    assert first_version not in versions(path) and len(versions(path)) == 2
+    assert np.array_equal(load_artifact(str(path)).predict_proba_rows(rows),
+                          load_artifact(os.path.join(tmp_path, versions(path)[0])).predict_proba_rows(rows))
+
+
+def test_an_unversioned_artifact_directory_is_replaced(pipeline, tmp_path):
+    path = tmp_path / "model"
+    save_artifact(pipeline, str(path))
+    os.rename(os.path.join(tmp_path, os.readlink(path)), tmp_path / "plain")
+    os.remove(path)
+    os.rename(tmp_path / "plain", path)
+
+    save_artifact(pipeline, str(path))
+    assert os.path.islink(path)
+    assert len(versions(path)) == 2
+    assert read_manifest(str(path))["model_id"] == read_manifest(os.path.join(tmp_path, versions(path)[0]))["model_id"]
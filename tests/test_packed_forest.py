@@ -0,0 +1,76 @@
+import numpy as np
+
+from packed_forest import PackedForestEngine
+
+
+def test_probabilities_match_the_pipeline(pipeline, training_data):
+    X, _ = training_data
+    engine = PackedForestEngine.from_pipeline(pipeline)
+    expected = pipeline.predict_proba(X)
+    actual = engine.predict_proba_rows(X.to_dict(orient='records'))
+
+    assert np.allclose(actual, expected, rtol=0, atol=1e-12)
+    assert np.array_equal(actual.argmax(axis=1), expected.argmax(axis=1))
+
+
+def test_leaves_match_sklearn(pipeline, training_data):
+    X, _ = training_data
+    engine = PackedForestEngine.from_pipeline(pipeline)
+    forest = pipeline.named_steps['classifier']
+    features = engine.encode(X.to_dict(orient='records'))
+    leaves = (engine.forest.apply(features) - engine.forest.roots[:, None]).T
+    assert np.array_equal(leaves, forest.apply(features))
+
+
+def test_contributions_add_up_to_the_probabilities(pipeline, training_data):
+    X, _ = training_data
+    rows = X.to_dict(orient='records')
+    engine = PackedForestEngine.from_pipeline(pipeline)
+    bias, contributions, columns = engine.explain_rows(rows)
+
+    assert contributions.shape == (len(rows), len(columns), len(engine.classes_))
+    assert np.allclose(bias + contributions.sum(axis=1), engine.predict_proba_rows(rows), rtol=0, atol=1e-9)
+
+
+def test_compact_forest_keeps_the_labels(pipeline, training_data):
+    X, _ = training_data
+    rows = X.to_dict(orient='records')
+    engine = PackedForestEngine.from_pipeline(pipeline)
+    compact = PackedForestEngine(engine.encoder, engine.forest.compact(np.float16), engine.classes_)
+
+    expected = engine.predict_proba_rows(rows)
+    actual = compact.predict_proba_rows(rows)
+    assert np.abs(actual - expected).max() < 1e-2
+    # Rows whose two most likely classes are near-ties may flip; the rest must not
+    top_two = np.sort(expected, axis=1)[:, -2:]
+    clear = top_two[:, 1] - top_two[:, 0] > 1e-2
+    assert np.array_equal(actual.argmax(axis=1)[clear], expected.argmax(axis=1)[clear])
+
+
+def test_compiled_and_packed_walks_agree(pipeline, training_data):
+    X, _ = training_data
+    engine = PackedForestEngine.from_pipeline(pipeline)
+    features = engine.encode(X.to_dict(orient='records'))
+    for forest in (engine.forest, engine.forest.compact(np.float16)):
+        assert forest.compiled_trees() is not None
+        compiled = forest.apply(features), forest.predict_proba(features)
+        forest.compiled_min_rows = len(features) + 1
+        packed = forest.apply(features), forest.predict_proba(features)
+
+        assert np.array_equal(compiled[0], packed[0])
+        assert np.array_equal(compiled[1], packed[1])
+
+
+def test_artifact_forest_uses_the_compiled_walk_for_large_batches(model_files, training_data):
+    from model_artifact import load_artifact
+
+    X, _ = training_data
+    engine = load_artifact(model_files["artifact"])
+    forest = engine.forest
+    features = engine.encode(X.head(forest.compiled_min_rows).to_dict(orient='records'))
+
+    # Small batches don't need sklearn; the first large one builds the compiled trees
+    forest.predict_proba(features[:1])
+    assert forest._compiled is None
+    forest.predict_proba(features)
+    assert forest._compiled
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from predictor import BACKENDS, build_engine, load_engine, predict_frame, predict_rows
+
+
+def test_single_pass_matches_predict_and_predict_proba(pipeline, training_data):
+    X, _ = training_data
+    result = predict_frame(pipeline, X)
+    expected_proba = pipeline.predict_proba(X)
+
+    assert np.array_equal(result.labels, pipeline.predict(X))
+    assert np.array_equal(result.probabilities, expected_proba)
+    assert np.array_equal(result.confidence, expected_proba.max(axis=1))
+
+
+def test_every_backend_predicts_like_the_pipeline(pipeline, training_data):
+    X, _ = training_data
+    rows = X.to_dict(orient='records')
+    expected = predict_frame(pipeline, X)
+    for backend in BACKENDS:
+        engine = build_engine(pipeline, backend)
+        result = predict_rows(engine, rows)
+        assert engine.name == backend
+        assert np.array_equal(result.labels, expected.labels), backend
+        assert np.allclose(result.probabilities, expected.probabilities, rtol=0, atol=1e-12), backend
+
+
+def test_loaded_pickle_and_artifact_predict_the_same(model_files, training_data):
+    rows = training_data[0].to_dict(orient='records')
+    from_pickle = predict_rows(load_engine(model_files["pickle"]), rows)
+    from_artifact = predict_rows(load_engine(model_files["artifact"]), rows)
+    assert np.array_equal(from_pickle.labels, from_artifact.labels)
+    assert np.allclose(from_pickle.probabilities, from_artifact.probabilities, rtol=0, atol=1e-12)
+
+
+def test_row_payload(pipeline, training_data):
+    X, _ = training_data
+    payload = predict_frame(pipeline, X.head(1)).row(0)
+    assert set(payload) == {"premium_category", "probabilities", "confidence"}
+    assert payload["premium_category"] == max(payload["probabilities"], key=payload["probabilities"].get)
+    assert abs(sum(payload["probabilities"].values()) - 1) < 1e-9
+
+
+def test_default_backend_follows_the_model_format(model_files):
+    assert load_engine(model_files["pickle"]).name == "fast"
+    assert load_engine(model_files["artifact"]).name == "packed"
+    assert load_engine(model_files["pickle"], "pipeline").name == "pipeline"
+
+
+def test_artifact_reports_a_backend_it_cant_serve(model_files, capsys):
+    assert load_engine(model_files["artifact"], "fast").name == "packed"
+    assert "'fast' backend requested" in capsys.readouterr().out
+
+    load_engine(model_files["artifact"], "packed")
+    assert capsys.readouterr().out == ""
+
+
+def test_unknown_backend_is_rejected(model_files):
+    for path in model_files.values():
+        with pytest.raises(ValueError):
+            load_engine(path, "gpu")
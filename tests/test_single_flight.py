@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+async def compute(calls: list, value, delay: float = 0.01):
+    calls.append(value)
+    await asyncio.sleep(delay)
+    if value == "fail":
+        raise ValueError(value)
+    return {"value": value}
+
+
+def test_identical_concurrent_calls_run_once():
+    async def scenario():
+        calls, coalesced = [], []
+        flight = SingleFlight(on_coalesced=coalesced.append)
+        results = await asyncio.gather(*[flight.do(key, lambda key=key: compute(calls, key)) for key in "aaabba"])
+        return flight, calls, coalesced, results
+
+    flight, calls, coalesced, results = asyncio.run(scenario())
+    assert [result["value"] for result in results] == list("aaabba")
+    assert sorted(calls) == ["a", "b"]
+    assert coalesced == list("aaba")
+    assert results[0] is results[1]
+    assert flight.in_flight == 0
+
+
+def test_calls_that_dont_overlap_are_not_merged():
+    async def scenario():
+        calls = []
+        flight = SingleFlight()
+        await flight.do("a", lambda: compute(calls, "a"))
+        await flight.do("a", lambda: compute(calls, "a"))
+        return calls
+
+    assert asyncio.run(scenario()) == ["a", "a"]
+
+
+def test_every_waiter_gets_the_exception():
+    async def scenario():
+        calls = []
+        flight = SingleFlight()
+        outcomes = await asyncio.gather(*[flight.do("f", lambda: compute(calls, "fail")) for _ in range(3)],
+                                        return_exceptions=True)
+        return calls, outcomes, flight
+
+    calls, outcomes, flight = asyncio.run(scenario())
+    assert calls == ["fail"]
+    assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+    assert flight.in_flight == 0
+
+
+def test_a_cancelled_caller_doesnt_cancel_the_shared_computation():
+    async def scenario():
+        calls = []
+        flight = SingleFlight()
+        first = asyncio.ensure_future(flight.do("c", lambda: compute(calls, "c")))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(flight.do("c", lambda: compute(calls, "c")))
+        await asyncio.sleep(0)
+        first.cancel()
+        result = await second
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return calls, result, flight
+
+    calls, result, flight = asyncio.run(scenario())
+    assert calls == ["c"]
+    assert result == {"value": "c"}
+    assert flight.in_flight == 0
@@ -0,0 +1,45 @@
+import asyncio
+
+import httpx
+
+
+def post_sweep(api, body: dict) -> httpx.Response:
+    async def run():
+        async with api.app.router.lifespan_context(api.app), \
+                httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://test") as client:
+            return await client.post("/predict/sweep", json=body)
+
+    return asyncio.run(run())
+
+
+def test_sweep_scores_every_combination(api, user_inputs):
+    response = post_sweep(api, {
+        "base": user_inputs[0],
+        "axes": [{"field": "Age", "start": 20, "stop": 60, "steps": 5}, {"field": "BMI", "values": [18.5, 25, 32]}]
+    })
+    assert response.status_code == 200, response.json()
+    body = response.json()
+    assert body["points"] == 15
+    assert [axis["values"] for axis in body["axes"]] == [[20, 30, 40, 50, 60], [18.5, 25, 32]]
+
+
+def test_oversized_explicit_values_are_rejected_by_the_schema(api, user_inputs):
+    values = list(range(api.SWEEP_MAX_POINTS + 1))
+    response = post_sweep(api, {"base": user_inputs[0], "axes": [{"field": "Age", "values": values}]})
+    assert response.status_code == 422
+
+
+def test_oversized_grid_is_rejected_before_validating_values(api, user_inputs, monkeypatch):
+    calls = []
+    prepare_input = api.prepare_input
+    # Startup warm-up requests would go through prepare_input too
+    monkeypatch.setattr(api, "WARMUP_PREDICTIONS", 0)
+    monkeypatch.setattr(api, "prepare_input", lambda user_input: calls.append(user_input) or prepare_input(user_input))
+    side = int(api.SWEEP_MAX_POINTS ** 0.5) + 1
+    response = post_sweep(api, {
+        "base": user_inputs[0],
+        "axes": [{"field": "Age", "values": list(range(side))}, {"field": "BMI", "values": list(range(side))}]
+    })
+    assert response.status_code == 400
+    assert "exceeds the limit" in response.json()["detail"]
+    assert calls == []
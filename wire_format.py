@@ -0,0 +1,94 @@
+"""Request and response encodings of the prediction API.
+
+JSON stays the default and is encoded with orjson, several times faster than
+the json module. Clients that send `Content-Type: application/msgpack` and/or
+`Accept: application/msgpack` get MessagePack instead, which is smaller and
+cheaper to parse and produce. Batches can also be sent and returned as
+columns (one array per field) rather than one object per row, so field names
+aren't repeated for every row.
+
+orjson and msgpack are optional: without orjson responses are encoded with the
+json module, and without msgpack MessagePack requests are refused with 415 and
+MessagePack responses are not offered.
+"""
+import json
+
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack", "application/vnd.msgpack")
+
+
+class UnsupportedMediaTypeError(ValueError):
+    """Raised for a request body in an encoding the API can't decode"""
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded with orjson when it is installed"""
+
+    def render(self, content) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+class MessagePackResponse(Response):
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def render(self, content) -> bytes:
+        return msgpack.packb(content, use_bin_type=True)
+
+
+def is_msgpack(media_type: str) -> bool:
+    media_type = (media_type or "").lower()
+    return any(candidate in media_type for candidate in MSGPACK_MEDIA_TYPES)
+
+
+def is_json(content_type: str) -> bool:
+    """JSON request bodies: application/json, any +json type, or no Content-Type at all"""
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    return not content_type or content_type == "application/json" or content_type.endswith("+json")
+
+
+def wants_msgpack(accept: str) -> bool:
+    """Whether an Accept header asks for MessagePack, and it can be produced"""
+    return msgpack is not None and is_msgpack(accept)
+
+
+def unpack_msgpack(body: bytes):
+    if msgpack is None:
+        raise UnsupportedMediaTypeError("MessagePack requests require the msgpack package on the server")
+    return msgpack.unpackb(body, raw=False)
+
+
+def decode_body(body: bytes, content_type: str):
+    """A MessagePack body if the Content-Type says so, else JSON"""
+    if is_msgpack(content_type):
+        return unpack_msgpack(body)
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+
+def render(content, accept: str, **kwargs) -> Response:
+    """MessagePack response if the Accept header asks for it, JSON otherwise"""
+    response_class = MessagePackResponse if wants_msgpack(accept) else FastJSONResponse
+    return response_class(content, **kwargs)
+
+
+def records_from_columns(columns: dict) -> list:
+    """{"Age": [31, 45], "Gender": ["Male", "Female"], ...} as one record per position"""
+    if not columns or not all(isinstance(values, list) for values in columns.values()):
+        raise ValueError("Columnar batches need an array of values for every field")
+    if len({len(values) for values in columns.values()}) != 1:
+        raise ValueError("Every column of a columnar batch must have the same length")
+    fields = list(columns)
+    return [dict(zip(fields, values)) for values in zip(*columns.values())]
@@ -0,0 +1,84 @@
+"""Applies admin actions to every worker of the pre-forked server.
+
+Under `serve --workers N` an admin request reaches a single worker. That
+worker applies the action itself, records it in a control file shared by all
+workers, and asks the parent process (SIGUSR1) to signal every worker; each
+worker then applies the recorded actions it hasn't applied yet. The file keeps
+the latest action of each kind with a generation number, so a worker that is
+restarted after a crash catches up when it starts.
+
+Without a control file (a single uvicorn process) actions only apply to the
+process that received them, which is then every process there is.
+"""
+import fcntl
+import json
+import os
+import signal
+import threading
+
+# Signal a worker sends the parent, and the parent forwards to every worker
+CONTROL_SIGNAL = signal.SIGUSR1
+
+
+class WorkerControl:
+    def __init__(self, path: str = None):
+        """path is the control file shared by the workers; serve.py sets it before forking"""
+        self.path = path
+        self.handlers = {}  # action name -> callable(**params)
+        self._applied = {}  # action key -> generation applied in this process
+        self._apply_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def register(self, action: str, handler):
+        self.handlers[action] = handler
+
+    def publish(self, action: str, key: str = None, **params):
+        """Record an action this worker has applied, and have every other worker apply it.
+
+        Only the latest action per key (default: the action name) is kept.
+        """
+        if not self.enabled:
+            return
+        key = key or action
+        with open(self.path, "r+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            state = json.loads(f.read() or "{}")
+            generation = state.get("generation", 0) + 1
+            state["generation"] = generation
+            state.setdefault("actions", {})[key] = {"action": action, "generation": generation, "params": params}
+            f.seek(0)
+            f.truncate()
+            json.dump(state, f)
+        self._applied[key] = generation
+        os.kill(os.getppid(), CONTROL_SIGNAL)
+
+    def read(self) -> dict:
+        with open(self.path) as f:
+            fcntl.flock(f, fcntl.LOCK_SH)
+            return json.loads(f.read() or "{}")
+
+    def apply_pending(self):
+        """Apply every recorded action newer than the one this process applied last (blocks, e.g. on reloads).
+
+        An action that fails is logged and retried on the next signal.
+        """
+        if not self.enabled:
+            return
+        with self._apply_lock:
+            for key, recorded in self.read().get("actions", {}).items():
+                handler = self.handlers.get(recorded["action"])
+                if handler is None or recorded["generation"] <= self._applied.get(key, 0):
+                    continue
+                try:
+                    handler(**recorded["params"])
+                except Exception as e:
+                    print(f"⚠️ Worker {os.getpid()} could not apply '{key}': {e}")
+                    continue
+                self._applied[key] = recorded["generation"]
+
+
+# The control of this process; serve.py points it at the shared file before forking workers
+control = WorkerControl()